@@ -0,0 +1,242 @@
+# analytics.py
+
+import numpy as np
+import pandas as pd
+
+from perf_utils import trace, traced
+
+
+def build_panel(filtered_df, columns):
+    # Date x Stock frames for `columns` in one DatetimeIndex-ed frame with (column, Stock) column levels; only
+    # these columns are reshaped. A stock's gaps are filled from its own previous row, so one ffill over each
+    # wide frame is masked back to the cells the stock has rows for, and dates it has no row on stay NaN.
+    if filtered_df.empty:
+        return pd.DataFrame()
+    with trace("build_panel", rows=len(filtered_df)):
+        # Factorizing both keys once and scattering each column into a grid is the unstack without its sort
+        dates = filtered_df["Date"]
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates)  # to_datetime's cache check iterates an already-parsed column
+        date_codes, dates = pd.factorize(dates, sort=True)
+        stock_codes, stocks = pd.factorize(filtered_df["Stock"], sort=True)
+        shape = (len(dates), len(stocks))
+        present = np.zeros(shape, dtype=bool)
+        present[date_codes, stock_codes] = True
+
+        index = pd.DatetimeIndex(dates, name="Date")
+        stock_index = pd.Index(np.asarray(stocks).astype(str), name="Stock")
+        frames = {}
+        for col in columns:
+            values = filtered_df[col]
+            # Float columns keep their dtype (float32 prices stay float32); others go through float64
+            dtype = values.dtype if isinstance(values.dtype, np.dtype) and values.dtype.kind == "f" else np.float64
+            grid = np.full(shape, np.nan, dtype=dtype)
+            grid[date_codes, stock_codes] = values.to_numpy(dtype=dtype, na_value=np.nan)
+            wide = pd.DataFrame(grid, index=index, columns=stock_index).ffill().where(present)
+            if isinstance(values.dtype, pd.api.extensions.ExtensionDtype):
+                wide = wide.astype(values.dtype)  # e.g. nullable Int64 Volume
+            frames[col] = wide
+    return pd.concat(frames, axis=1)
+
+
+def build_pivot(filtered_df, selected_columns):
+    # The first selected column as a Date x Stock frame, which every analysis builds on
+    if filtered_df.empty:
+        return pd.DataFrame()
+    return build_panel(filtered_df, selected_columns[:1])[selected_columns[0]]
+
+
+def daily_returns(pivot_df):
+    # Prices may be held as float32; returns and everything derived from them are computed in float64
+    return pivot_df.astype(np.float64).pct_change().dropna()
+
+
+def volatility(daily_return):
+    return daily_return.std()
+
+
+def correlation(daily_return):
+    return daily_return.corr()
+
+
+def _paired(daily_return, benchmark):
+    # Benchmark vector x against every other stock as columns of y, masked to rows where both are present
+    others = daily_return.drop(columns=benchmark)
+    x = daily_return[benchmark].to_numpy(dtype=np.float64)
+    y = others.to_numpy(dtype=np.float64)
+    mask = ~np.isnan(y) & ~np.isnan(x)[:, None]
+    return others.columns, np.where(mask, x[:, None], 0.0), np.where(mask, y, 0.0), mask
+
+
+def _ols_from_moments(n, sum_x, sum_y, sum_xx, sum_xy, sum_yy):
+    # Closed-form simple OLS (y = alpha + beta * x) from per-column sums
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov_xy = sum_xy - sum_x * sum_y / n
+        var_x = sum_xx - sum_x * sum_x / n
+        var_y = sum_yy - sum_y * sum_y / n
+        beta = cov_xy / var_x
+        alpha = (sum_y - beta * sum_x) / n
+        r_squared = cov_xy * cov_xy / (var_x * var_y)
+    return alpha, beta, r_squared
+
+
+@traced(rows=len)
+def regression_stats(daily_return, benchmark):
+    stocks, x, y, mask = _paired(daily_return, benchmark)
+    n = mask.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_x, mean_y = x.sum(axis=0) / n, y.sum(axis=0) / n
+    # Center first so the full-sample fit keeps statsmodels-level precision
+    dx = np.where(mask, x - mean_x, 0.0)
+    dy = np.where(mask, y - mean_y, 0.0)
+    _, beta, r_squared = _ols_from_moments(
+        n, 0.0, 0.0, (dx * dx).sum(axis=0), (dx * dy).sum(axis=0), (dy * dy).sum(axis=0)
+    )
+    alpha = mean_y - beta * mean_x
+    return pd.DataFrame({"Stock": stocks, "Alpha": alpha, "Beta": beta, "R²": r_squared})
+
+
+@traced(rows=len)
+def rolling_beta(daily_return, benchmark, window=60):
+    stocks, x, y, mask = _paired(daily_return, benchmark)
+
+    def window_sum(values):
+        csum = np.cumsum(values, axis=0)
+        csum[window:] = csum[window:] - csum[:-window]
+        return csum
+
+    n = window_sum(mask.astype(np.float64))
+    _, beta, _ = _ols_from_moments(
+        n, window_sum(x), window_sum(y), window_sum(x * x), window_sum(x * y), window_sum(y * y)
+    )
+    beta[n < window] = np.nan
+    return pd.DataFrame(beta, index=daily_return.index, columns=stocks)
+
+
+ROLLING_WINDOWS = (20, 60, 252)
+
+
+def _expanding_moments(x, y, carry=None):
+    # Cumulative pairwise-complete moments of y against x, continued from `carry` (the last row of a previous call)
+    mask = ~np.isnan(y) & ~np.isnan(x)
+    x, y = np.where(mask, x, 0.0), np.where(mask, y, 0.0)
+    moments = [np.cumsum(m, axis=0) for m in (mask.astype(np.float64), x, y, x * x, y * y, x * y)]
+    if carry is not None:
+        moments = [m + c for m, c in zip(moments, carry, strict=True)]
+    return moments
+
+
+def _expanding_stat(stat, moments):
+    n, sum_x, sum_y, sum_xx, sum_yy, sum_xy = moments
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var_y = (sum_yy - sum_y * sum_y / n) / (n - 1)
+        if stat == "volatility":
+            result = np.sqrt(var_y)
+        else:
+            var_x = (sum_xx - sum_x * sum_x / n) / (n - 1)
+            cov_xy = (sum_xy - sum_x * sum_y / n) / (n - 1)
+            result = cov_xy / np.sqrt(var_x * var_y)
+    result[n < 2] = np.nan
+    return result
+
+
+def rolling_volatility(daily_return, window=None):
+    roll = daily_return.expanding(min_periods=2) if window is None else daily_return.rolling(window)
+    return roll.std()
+
+
+def rolling_correlation(daily_return, benchmark, window=None):
+    others = daily_return.drop(columns=benchmark)
+    roll = others.expanding(min_periods=2) if window is None else others.rolling(window)
+    return roll.corr(daily_return[benchmark])
+
+
+class IncrementalRolling:
+    # Rolling ("volatility" or "correlation" vs. `benchmark`) stat that is extended as the date range grows:
+    # fixed windows recompute only new rows plus `window - 1` rows of lookback, expanding windows carry
+    # their cumulative moments forward so each new row is O(1).
+
+    def __init__(self, stat, window=None, benchmark=None):
+        self.stat = stat
+        self.window = window
+        self.benchmark = benchmark
+        self.result = None
+        self._carry = None
+
+    def _frame(self, daily_return):
+        return daily_return if self.stat == "volatility" else daily_return.drop(columns=self.benchmark)
+
+    def _compute(self, daily_return):
+        if self.stat == "volatility":
+            return rolling_volatility(daily_return, self.window)
+        return rolling_correlation(daily_return, self.benchmark, self.window)
+
+    def _compute_expanding(self, daily_return):
+        if daily_return.empty:
+            # e.g. a one-day range or stocks with no common dates: nothing to add, and no last row to carry
+            return pd.DataFrame(index=daily_return.index, columns=self._frame(daily_return).columns, dtype=np.float64)
+        y = self._frame(daily_return).to_numpy(dtype=np.float64)
+        x = y if self.stat == "volatility" else daily_return[[self.benchmark]].to_numpy(dtype=np.float64)
+        moments = _expanding_moments(x, y, self._carry)
+        self._carry = [m[-1] for m in moments]
+        return pd.DataFrame(_expanding_stat(self.stat, moments), index=daily_return.index,
+                            columns=self._frame(daily_return).columns)
+
+    def update(self, daily_return):
+        start_moved = self.result is not None and (
+            self.result.empty or daily_return.empty or daily_return.index[0] != self.result.index[0]
+        )
+        if self.result is None or start_moved:
+            self._carry = None
+            self.result = self._compute_expanding(daily_return) if self.window is None else self._compute(daily_return)
+            return self.result
+
+        last = self.result.index[-1]
+        new_rows = daily_return.index > last
+        if new_rows.any():
+            if self.window is None:
+                tail = self._compute_expanding(daily_return[new_rows])
+            else:
+                start = max(int(np.argmax(new_rows)) - (self.window - 1), 0)
+                tail = self._compute(daily_return.iloc[start:])[new_rows[start:]]
+            self.result = pd.concat([self.result, tail])
+        return self.result.loc[:daily_return.index[-1]]
+
+
+# Charts never need more points than the browser has pixels to draw them on
+CHART_MAX_POINTS = 1000
+
+
+def lttb_indices(y, n_out):
+    # Largest-Triangle-Three-Buckets: keeps the first and last point plus, per bucket, the point forming the
+    # largest triangle with the previously kept point and the next bucket's mean. x is the row position.
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    edges = np.append(edges, n)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi, next_hi = edges[i], edges[i + 1], edges[i + 2]
+        avg_x, avg_y = x[hi:next_hi].mean(), y[hi:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def downsample_frame(df, max_points=CHART_MAX_POINTS):
+    # Row subset of a time-indexed frame for line charts: LTTB per column over its non-NaN rows, unioned,
+    # with each column allotted an equal share of `max_points`
+    if len(df) <= max_points or df.empty:
+        return df
+    per_column = max(3, max_points // max(len(df.columns), 1))
+    keep = np.zeros(len(df), dtype=bool)
+    for col in df.columns:
+        values = df[col].to_numpy(dtype=np.float64)
+        valid = np.flatnonzero(~np.isnan(values))
+        keep[valid[lttb_indices(values[valid], per_column)]] = True
+    return df[keep]
@@ -0,0 +1,152 @@
+# benchmarks/bench_concurrency.py
+#
+# Usage: python -m benchmarks.bench_concurrency [--tickers 200] [--years 5] [--readers 4] [--seconds 5]
+#                                               [--ingest thread|process]
+#
+# Reader throughput and latency while an ingest keeps upserting daily batches,
+# like a session browsing read mode during another session's upload (thread)
+# or a CLI ingest (process). Pooled read-only connections are compared with
+# the previous fresh sqlite3.connect per query.
+
+import argparse
+import multiprocessing
+import os
+import queue
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from db_utils import (
+    STOCK_COLUMNS, close_pool, compact_stock_frame, read_database, save_to_db, _build_where,
+)
+from sync_utils import checkpoint
+from benchmarks.synthetic import make_ohlc
+
+QUERY_STOCKS = 10
+QUERY_COLUMNS = ["Close"]
+
+
+def _read_fresh(db_path, stocks=None, date_range=None, columns=None):
+    # read_database as it was before the pool: a new connection per call
+    columns = STOCK_COLUMNS if columns is None else [c for c in STOCK_COLUMNS if c in columns]
+    where, params = _build_where(stocks, date_range)
+    conn = sqlite3.connect(db_path)
+    df = pd.read_sql(f"SELECT {', '.join(['Stock', 'Date'] + columns)} FROM stock_data{where}", conn, params=params)
+    conn.close()
+    return compact_stock_frame(df)
+
+
+READERS = {"pooled": read_database, "fresh": _read_fresh}
+
+
+def _ingest(db_path, tickers, stop, results):
+    # Upserts one trading day per batch, cycling through a year, until told to stop
+    batches = [group for _, group in make_ohlc(tickers, 1, seed=1).groupby("Date")]
+    rows, latencies = 0, []
+    while not stop.is_set():
+        for batch in batches:
+            if stop.is_set():
+                break
+            start = time.perf_counter()
+            save_to_db(batch, db_path, on_conflict="update")
+            latencies.append(time.perf_counter() - start)
+            rows += len(batch)
+    results.put((rows, latencies))
+
+
+def _reader(read, db_path, stocks, date_range, deadline, latencies, errors, seed):
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            read(db_path, stocks=rng.sample(stocks, QUERY_STOCKS), date_range=date_range, columns=QUERY_COLUMNS)
+        except sqlite3.OperationalError:
+            errors.append(1)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+def _run_scenario(base_path, db_path, name, reader, ingest, args, stocks, date_range):
+    shutil.copy(base_path, db_path)
+
+    stop, results, worker = None, None, None
+    if ingest == "thread":
+        stop, results = threading.Event(), queue.Queue()
+        worker = threading.Thread(target=_ingest, args=(db_path, args.tickers, stop, results))
+    elif ingest == "process":
+        ctx = multiprocessing.get_context("spawn")
+        stop, results = ctx.Event(), ctx.Queue()
+        worker = ctx.Process(target=_ingest, args=(db_path, args.tickers, stop, results))
+    if worker is not None:
+        worker.start()
+        time.sleep(1.0)  # let the ingest build its batches and start writing
+
+    latencies, errors = [], []
+    deadline = time.perf_counter() + args.seconds
+    threads = [
+        threading.Thread(
+            target=_reader, args=(READERS[reader], db_path, stocks, date_range, deadline, latencies, errors, i)
+        )
+        for i in range(args.readers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ingest_rows, write_latencies = 0, []
+    if worker is not None:
+        stop.set()
+        ingest_rows, write_latencies = results.get()
+        worker.join()
+    close_pool(db_path)
+
+    ms = np.array(latencies) * 1000
+    line = (f"  {name:28s} {len(ms) / args.seconds:8.1f} q/s  p50 {np.percentile(ms, 50):7.1f} ms  "
+            f"p95 {np.percentile(ms, 95):7.1f} ms  errors {len(errors)}")
+    if write_latencies:
+        line += (f"  | ingest {ingest_rows / sum(write_latencies):9,.0f} rows/s, "
+                 f"p95 batch {np.percentile(write_latencies, 95) * 1000:.0f} ms")
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure reader throughput while an ingest is running")
+    parser.add_argument("--tickers", type=int, default=200)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--ingest", choices=("thread", "process"), default="thread")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base_path = os.path.join(tmp, "base.db")
+        ohlc = make_ohlc(args.tickers, args.years)
+        save_to_db(ohlc, base_path)
+        checkpoint(base_path)
+        close_pool(base_path)
+        stocks = sorted(ohlc["Stock"].unique())
+        last = ohlc["Date"].max()
+        date_range = (last.replace(year=last.year - 1), last)
+        print(f"data: {len(ohlc):,} rows; {args.readers} readers x {args.seconds:g}s, "
+              f"{QUERY_STOCKS} stocks x 1y of {', '.join(QUERY_COLUMNS)} per query; ingest in a {args.ingest}")
+
+        scenarios = [
+            ("pooled, idle", "pooled", None),
+            ("pooled, during ingest", "pooled", args.ingest),
+            ("fresh connect, idle", "fresh", None),
+            ("fresh connect, during ingest", "fresh", args.ingest),
+        ]
+        for i, (name, reader, ingest) in enumerate(scenarios):
+            db_path = os.path.join(tmp, f"scenario{i}.db")
+            _run_scenario(base_path, db_path, name, reader, ingest, args, stocks, date_range)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# benchmarks/bench_equity.py
+#
+# Usage: python -m benchmarks.bench_equity [--trades 1000000] [--stocks 250] [--brokers 40] [--days 20]
+#
+# Equity Monitor summaries for one filter state on a synthetic blotter: the
+# previous one-groupby-per-table over object columns against a single
+# categorical trade cube that every table and chart re-aggregates.
+
+import argparse
+import time
+
+import pandas as pd
+
+from equity_utils import CUBE_KEYS, _categorize, rollup_cube, summarize_frame, trade_cube
+from benchmarks.synthetic import make_trades
+
+# What one rerun with every summary, chart and the weighted price table enabled asks for
+VIEWS = [
+    ["Fund", "Buy_Sell"],
+    ["Stock", "Buy_Sell"],
+    ["Broker", "Buy_Sell"],
+    ["Date", "Fund", "Buy_Sell", "Stock"],
+]
+
+
+def per_view(trades):
+    return [summarize_frame(trades, by) for by in VIEWS]
+
+
+def via_cube(trades):
+    cube = trade_cube(trades)
+    return [rollup_cube(cube, by) for by in VIEWS]
+
+
+def timed(func, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Equity Monitor trade cube against per-view groupbys")
+    parser.add_argument("--trades", type=int, default=1_000_000)
+    parser.add_argument("--stocks", type=int, default=250)
+    parser.add_argument("--brokers", type=int, default=40)
+    parser.add_argument("--days", type=int, default=20)
+    args = parser.parse_args()
+
+    trades = make_trades(args.trades, args.stocks, args.brokers, args.days)
+    categorical, categorize_seconds = timed(_categorize, trades.copy(), repeat=1)
+    print(f"blotter: {len(trades):,} trades; categorizing labels once per upload: {categorize_seconds:.3f}s")
+
+    expected, object_seconds = timed(per_view, trades)
+    _, categorical_seconds = timed(per_view, categorical)
+    actual, cube_seconds = timed(via_cube, categorical)
+    for want, got in zip(expected, actual, strict=True):
+        pd.testing.assert_frame_equal(got, want, check_exact=False, rtol=1e-9)
+
+    cube = trade_cube(categorical)
+    _, rollup_seconds = timed(lambda: [rollup_cube(cube, by) for by in VIEWS])
+    print(f"per-view groupby, object labels:      {object_seconds:8.3f}s")
+    print(f"per-view groupby, categorical labels: {categorical_seconds:8.3f}s  ({object_seconds / categorical_seconds:.1f}x)")
+    print(f"one cube ({len(cube):,} cells over {', '.join(CUBE_KEYS)}) + rollups: "
+          f"{cube_seconds:8.3f}s  ({object_seconds / cube_seconds:.1f}x), results match")
+    # The cube is cached per filter state, so toggling a chart or table only pays for the rollups
+    print(f"rerun on a cached cube, rollups only: {rollup_seconds:8.3f}s  ({object_seconds / rollup_seconds:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
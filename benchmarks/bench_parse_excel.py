@@ -0,0 +1,92 @@
+# benchmarks/bench_parse_excel.py
+#
+# Usage: python -m benchmarks.bench_parse_excel [--tickers 500] [--years 5]
+
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import openpyxl
+import pandas as pd
+
+from excel_utils import parse_excel
+from benchmarks.synthetic import write_bth_workbook
+
+
+def parse_excel_cellwise(file):
+    # Reference copy of the original cell-by-cell parser
+    wb = openpyxl.load_workbook(file, data_only=True)
+    ws = wb.active
+    datasets = []
+    col_index = 1
+    while True:
+        stock_cell = ws.cell(row=4, column=col_index)
+        if stock_cell.value is None:
+            break
+        stock = stock_cell.value.split()[0]
+        data = []
+        row_index = 6
+        while True:
+            row = [
+                ws.cell(row=row_index, column=col_index + i).value for i in range(7)
+            ]
+            if all(cell is None for cell in row):
+                break
+            row = [None if str(cell).strip().upper() in ["#N/A", "N/A", "#N/A N/A"] else cell for cell in row]
+            data.append(row)
+            row_index += 1
+        if data:
+            df = pd.DataFrame(data, columns=["Date", "Open", "High", "Low", "Close", "Volume", "Value"])
+            df.insert(0, "Stock", stock)
+            df["Date"] = pd.to_datetime(df["Date"]).dt.date
+            datasets.append(df)
+        col_index += 8
+    return pd.concat(datasets, ignore_index=True) if datasets else pd.DataFrame()
+
+
+PARSERS = {"cellwise": parse_excel_cellwise, "streaming": parse_excel}
+
+
+def _run_parser(name, path):
+    start = time.perf_counter()
+    result = PARSERS[name](path)
+    elapsed = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return result, elapsed, peak_rss
+
+
+def run_isolated(func, *args):
+    # Fresh interpreter per step; peak RSS is inherited by children, so the parent must stay small
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(func, *args).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parse_excel against the cell-by-cell parser")
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--years", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bth.xlsx")
+        start = time.perf_counter()
+        run_isolated(write_bth_workbook, path, args.tickers, args.years)
+        print(f"workbook: {args.tickers} tickers x {args.years}y, "
+              f"{os.path.getsize(path) / 1e6:.1f} MB, built in {time.perf_counter() - start:.1f}s")
+
+        results = {}
+        for name in PARSERS:
+            df, elapsed, peak_rss = run_isolated(_run_parser, name, path)
+            results[name] = df
+            print(f"{name:>10}: {elapsed:8.2f}s  peak RSS {peak_rss / 1e6:8.1f} MB  rows {len(df):,}")
+
+    pd.testing.assert_frame_equal(results["cellwise"], results["streaming"], check_dtype=False)
+    print("outputs match")
+
+
+if __name__ == "__main__":
+    main()
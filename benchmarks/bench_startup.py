@@ -0,0 +1,100 @@
+# benchmarks/bench_startup.py
+#
+# Usage: python -m benchmarks.bench_startup [--repeat 3]
+#
+# Import cost of each module the apps pull in, first-paint time of each app
+# (AppTest's first script run against a local DB) and the first switch to read
+# mode a moment later, every sample in a fresh interpreter so nothing is
+# already imported or cached.
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APPS = ("db_app.py", "db_app_uat.py")
+MODULES = (
+    "streamlit", "pandas", "db_utils", "analytics", "cache_utils", "stock_page", "excel_utils", "ingest",
+    "drive_utils", "openpyxl", "matplotlib.pyplot",
+)
+# Only needed by specific actions; none of these should load on first paint
+HEAVY_MODULES = ("matplotlib", "openpyxl", "googleapiclient")
+READ_MODE = "Read an Existing Database"
+USER_DELAY = 1.0  # seconds between first paint and the user's first click
+
+
+def _child_import(module):
+    start = time.perf_counter()
+    __import__(module)
+    return {"seconds": time.perf_counter() - start}
+
+
+def _child_paint(app):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, app), default_timeout=120)
+    start = time.perf_counter()
+    at.run()
+    first_paint = time.perf_counter() - start
+    heavy = [m for m in HEAVY_MODULES if m in sys.modules]
+
+    time.sleep(USER_DELAY)
+    mode = next(radio for radio in at.sidebar.radio if READ_MODE in radio.options)
+    start = time.perf_counter()
+    mode.set_value(READ_MODE).run()
+    read_mode = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return {"seconds": first_paint, "read_mode": read_mode, "heavy": heavy}
+
+
+def _run_child(kind, target, cwd=ROOT):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child", kind, target],
+        cwd=cwd, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _make_db(path):
+    from db_utils import save_to_db
+    from benchmarks.synthetic import make_ohlc
+
+    save_to_db(make_ohlc(100, 2), path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure app import time and first paint")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--child", nargs=2, metavar=("KIND", "TARGET"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        kind, target = args.child
+        result = _child_import(target) if kind == "import" else _child_paint(target)
+        print(json.dumps(result))
+        return
+
+    print("import time (best of %d, fresh interpreter each)" % args.repeat)
+    for module in MODULES:
+        best = min(_run_child("import", module)["seconds"] for _ in range(args.repeat))
+        print(f"  {module:20s} {best:7.3f}s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _make_db(os.path.join(tmp, "ohlc_bbdata.db"))
+        print("\nfirst paint / first read-mode render with a local DB (best of %d)" % args.repeat)
+        for app in APPS:
+            runs = [_run_child("paint", app, cwd=tmp) for _ in range(args.repeat)]
+            first_paint = min(run["seconds"] for run in runs)
+            read_mode = min(run["read_mode"] for run in runs)
+            heavy = ", ".join(runs[0]["heavy"]) or "none"
+            print(f"  {app:20s} {first_paint:7.3f}s / {read_mode:7.3f}s  heavy modules on first paint: {heavy}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# benchmarks/bench_storage.py
+#
+# Usage: python -m benchmarks.bench_storage [--tickers 500] [--years 5]
+# Needs pyarrow for the Parquet backend.
+
+import argparse
+import os
+import resource
+import tempfile
+import time
+
+from db_utils import read_database, save_to_db
+from parquet_store import convert_sqlite_to_parquet, read_parquet
+from analytics import build_pivot
+from benchmarks.bench_parse_excel import run_isolated
+from benchmarks.synthetic import make_ohlc
+
+READERS = {"sqlite": read_database, "parquet": read_parquet}
+
+
+def _build(db_path, roots, n_tickers, years):
+    ohlc = make_ohlc(n_tickers, years)
+    save_to_db(ohlc, db_path)
+    seconds = {}
+    for partition, root in roots.items():
+        start = time.perf_counter()
+        convert_sqlite_to_parquet(db_path, root, partition)
+        seconds[partition] = time.perf_counter() - start
+    return len(ohlc), sorted(ohlc["Stock"].unique()), str(ohlc["Date"].max()), seconds
+
+
+def _run_query(backend, source, stocks, date_range, columns):
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    df = READERS[backend](source, stocks=stocks, date_range=date_range, columns=columns)
+    load_seconds = time.perf_counter() - start
+    build_pivot(df, columns or ["Close"])
+    total_seconds = time.perf_counter() - start
+    peak = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline) * 1024
+    return len(df), load_seconds, total_seconds, peak
+
+
+def _dir_size(root):
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(root) for f in files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare SQLite and Parquet load time and memory for read-mode queries")
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--years", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        roots = {"year": os.path.join(tmp, "by_year"), "stock": os.path.join(tmp, "by_stock")}
+        n_rows, stocks, last_date, convert_seconds = run_isolated(_build, db_path, roots, args.tickers, args.years)
+        print(f"data: {n_rows:,} rows; sqlite {os.path.getsize(db_path) / 1e6:.1f} MB, "
+              + ", ".join(f"parquet/{p} {_dir_size(r) / 1e6:.1f} MB (converted in {convert_seconds[p]:.1f}s)"
+                          for p, r in roots.items()))
+
+        last_year = (f"{int(last_date[:4])}-01-01", last_date)
+        queries = {
+            "Close, 10 stocks, last year": (stocks[:10], last_year, ["Close"]),
+            "Close, all stocks, all dates": (None, None, ["Close"]),
+            "all columns, 1 stock": (stocks[:1], None, None),
+        }
+        sources = {"sqlite": db_path, "parquet/year": roots["year"], "parquet/stock": roots["stock"]}
+        for label, (query_stocks, date_range, columns) in queries.items():
+            print(f"\n{label}")
+            for name, source in sources.items():
+                backend = name.split("/")[0]
+                rows, load_seconds, total_seconds, peak = run_isolated(
+                    _run_query, backend, source, query_stocks, date_range, columns
+                )
+                print(f"  {name:14s} {rows:>10,} rows  load {load_seconds:7.3f}s  "
+                      f"load+pivot {total_seconds:7.3f}s  peak +{peak / 1e6:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+# benchmarks/conftest.py
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--bench-scale", choices=("small", "full"), default="small",
+        help="Input size for benchmarks/suite.py (default: small)",
+    )
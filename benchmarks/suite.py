@@ -0,0 +1,165 @@
+# benchmarks/suite.py
+#
+# Usage: python -m pytest benchmarks/suite.py [--bench-scale small|full] [-k parse_excel] --benchmark-autosave
+#        python -m pytest benchmarks/suite.py --benchmark-compare --benchmark-compare-fail=median:25%
+#        pytest-benchmark compare   (saved runs side by side)
+# Needs pytest-benchmark (pip install pytest-benchmark).
+#
+# pytest-benchmark regression suite over the pipeline on seeded synthetic data:
+# BTH parsing, save_to_db into an empty and into a loaded DB, read_database, a
+# streamed CSV export, the read-mode pivot/analysis block and the Equity Monitor
+# load and aggregations. --benchmark-autosave stores each run under .benchmarks/
+# with its commit; --benchmark-compare checks this run against the latest saved
+# one, and --benchmark-compare-fail turns a slower median into a failure. Compare
+# runs of the same --bench-scale only (each case records it in extra_info).
+
+import os
+import shutil
+from functools import cached_property
+
+import pytest
+
+from db_utils import close_pool, iter_database, read_database, save_to_db
+from sync_utils import checkpoint
+from excel_utils import parse_excel
+from export_utils import write_export
+from analytics import (
+    build_pivot, daily_returns, volatility, correlation, regression_stats, rolling_beta, rolling_volatility,
+)
+from equity_utils import _categorize, load_trades, save_trades, stored_trade_cube
+from benchmarks.bench_equity import via_cube
+from benchmarks.synthetic import make_ohlc, make_trades, write_bth_workbook, write_equity_workbook
+
+SCALES = {
+    "small": {"tickers": 50, "years": 2, "trades": 100_000, "workbook_trades": 10_000, "repeat": 5},
+    "full": {"tickers": 500, "years": 5, "trades": 1_000_000, "workbook_trades": 100_000, "repeat": 3},
+}
+QUERY_STOCKS = 10
+ANALYSIS_STOCKS = 50
+ROLLING_WINDOW = 60
+
+
+class Fixtures:
+    # Inputs built on first use and shared by every case of a run
+
+    def __init__(self, tmp, scale):
+        self.tmp = tmp
+        self.scale = scale
+        self._runs = 0
+
+    def path(self, name):
+        return os.path.join(self.tmp, name)
+
+    def fresh_path(self, name):
+        # A new file per repeat, so no case times work left over from the previous one
+        self._runs += 1
+        return self.path(f"{self._runs}_{name}")
+
+    @cached_property
+    def ohlc(self):
+        return make_ohlc(self.scale["tickers"], self.scale["years"])
+
+    @cached_property
+    def last_day(self):
+        return self.ohlc[self.ohlc["Date"] == self.ohlc["Date"].max()]
+
+    @cached_property
+    def stocks(self):
+        return sorted(self.ohlc["Stock"].unique())
+
+    @cached_property
+    def bth_path(self):
+        return write_bth_workbook(self.path("bth.xlsx"), self.scale["tickers"], self.scale["years"])
+
+    @cached_property
+    def db_path(self):
+        # Everything but the last day, checkpointed so copies of it start from a clean file
+        path = self.path("base.db")
+        save_to_db(self.ohlc[self.ohlc["Date"] < self.ohlc["Date"].max()], path)
+        checkpoint(path)
+        close_pool(path)
+        return path
+
+    @cached_property
+    def last_year(self):
+        last = self.ohlc["Date"].max()
+        return last.replace(year=last.year - 1), last
+
+    @cached_property
+    def analysis_rows(self):
+        return read_database(self.db_path, stocks=self.stocks[:ANALYSIS_STOCKS], columns=["Close"])
+
+    @cached_property
+    def equity_workbook(self):
+        write_equity_workbook(self.path("equity.xlsx"), self.scale["workbook_trades"])
+        with open(self.path("equity.xlsx"), "rb") as fh:
+            return fh.read()
+
+    @cached_property
+    def trades(self):
+        return _categorize(make_trades(self.scale["trades"]))
+
+    @cached_property
+    def trade_db(self):
+        path = self.path("trades.db")
+        save_trades(self.trades, path)
+        return path
+
+
+def _copy_db(fx):
+    path = fx.fresh_path("append.db")
+    shutil.copy(fx.db_path, path)
+    return path
+
+
+def _analysis(df):
+    pivot = build_pivot(df.copy(), ["Close"])
+    daily_return = daily_returns(pivot)
+    benchmark = daily_return.columns[0]
+    volatility(daily_return)
+    correlation(daily_return)
+    regression_stats(daily_return, benchmark)
+    rolling_beta(daily_return, benchmark, ROLLING_WINDOW)
+    rolling_volatility(daily_return, ROLLING_WINDOW)
+    return len(df)
+
+
+# name -> (prepare(fx) -> state, untimed; run(fx, state) -> rows processed, timed)
+CASES = {
+    "parse_excel": (lambda fx: fx.bth_path, lambda fx, path: len(parse_excel(path))),
+    "save_to_db_empty": (
+        lambda fx: (fx.ohlc, fx.fresh_path("empty.db")),
+        lambda fx, state: len(save_to_db(*state)),
+    ),
+    "save_to_db_append_day": (_copy_db, lambda fx, path: len(save_to_db(fx.last_day, path))),
+    "read_database_query": (
+        lambda fx: fx.db_path,
+        lambda fx, path: len(read_database(
+            path, stocks=fx.stocks[:QUERY_STOCKS], date_range=fx.last_year, columns=["Close"]
+        )),
+    ),
+    "read_database_all": (lambda fx: fx.db_path, lambda fx, path: len(read_database(path))),
+    "export_csv_all": (
+        lambda fx: (fx.db_path, fx.fresh_path("export.csv")),
+        lambda fx, state: write_export(iter_database(state[0]), state[1], "csv"),
+    ),
+    "pivot_analysis": (lambda fx: fx.analysis_rows, lambda fx, df: _analysis(df)),
+    "equity_load_trades": (lambda fx: fx.equity_workbook, lambda fx, data: len(load_trades(data))),
+    "equity_aggregations": (lambda fx: fx.trades, lambda fx, trades: (via_cube(trades), len(trades))[1]),
+    "equity_stored_cube": (lambda fx: fx.trade_db, lambda fx, path: len(stored_trade_cube(path))),
+}
+
+
+@pytest.fixture(scope="session")
+def fx(request, tmp_path_factory):
+    scale = request.config.getoption("bench_scale")
+    yield Fixtures(str(tmp_path_factory.mktemp("bench")), dict(SCALES[scale], name=scale))
+    close_pool()
+
+
+@pytest.mark.parametrize("case", list(CASES))
+def test_case(benchmark, fx, case):
+    prepare, run = CASES[case]
+    # Preparation runs untimed before every round, so each round starts from the same state
+    rows = benchmark.pedantic(run, setup=lambda: ((fx, prepare(fx)), {}), rounds=fx.scale["repeat"])
+    benchmark.extra_info.update(scale=fx.scale["name"], rows=int(rows))
@@ -0,0 +1,139 @@
+# benchmarks/synthetic.py
+#
+# Seeded generators for the benchmarks: daily OHLC frames and BTH-layout
+# workbooks (ticker header on row 4, data from row 6, 7-column blocks every
+# 8 columns, Bloomberg #N/A gaps), and trade blotters and Equity Monitor
+# workbooks with one sheet per FUND_SHEET_MAP entry. The same arguments always
+# give the same data.
+
+import zipfile
+
+import numpy as np
+import pandas as pd
+import openpyxl
+
+from openpyxl.utils import get_column_letter
+
+from excel_utils import BTH_COLUMNS, BLOCK_STRIDE
+from equity_utils import FUND_SHEET_MAP
+
+
+def _add_dimension(path, ref, sheet="xl/worksheets/sheet1.xml"):
+    # openpyxl's write-only mode omits <dimension>, which Excel-saved BTH exports carry;
+    # without it read-only loaders have to scan the whole sheet just to size it
+    with zipfile.ZipFile(path) as src:
+        members = [(info, src.read(info)) for info in src.infolist()]
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as dst:
+        for info, data in members:
+            if info.filename == sheet:
+                data = data.replace(b"<sheetViews>", f'<dimension ref="{ref}" /><sheetViews>'.encode(), 1)
+            dst.writestr(info, data)
+
+
+def make_ohlc(n_tickers=500, years=5, seed=0, end="2024-12-31"):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=end, periods=years * 252)
+    frames = []
+    for i in range(n_tickers):
+        # Stagger listing dates so some tickers have shorter histories
+        start = int(rng.integers(0, len(dates) // 4)) if i % 5 == 0 else 0
+        n = len(dates) - start
+        close = np.round(rng.uniform(1, 500) * np.exp(np.cumsum(rng.normal(0, 0.015, n))), 2)
+        spread = np.abs(rng.normal(0, 0.01, n)) * close
+        volume = rng.integers(1_000, 5_000_000, n)
+        frames.append(pd.DataFrame({
+            "Stock": f"T{i:04d}",
+            "Date": dates[start:].date,
+            "Open": np.round(close + rng.normal(0, 0.5, n) * spread, 2),
+            "High": np.round(close + spread, 2),
+            "Low": np.round(close - spread, 2),
+            "Close": close,
+            "Volume": volume,
+            "Value": np.round(volume * close, 2),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def make_trades(n_trades=1_000_000, n_stocks=250, n_brokers=40, days=20, seed=0, end="2024-12-31"):
+    # A blotter shaped like load_trades' output: one row per fill across every fund sheet
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=end, periods=days)
+    # Each fill lands on one fund sheet, which fixes its Fund and Classification (SSS_FVTOCI -> SSS, FVTOCI)
+    sheets = np.array([(fund, sheet.split("_", 1)[1]) for fund, names in FUND_SHEET_MAP.items() for sheet in names])
+    sheet = sheets[rng.integers(0, len(sheets), n_trades)]
+    stocks = np.array([f"T{i:04d}" for i in range(n_stocks)])
+    brokers = np.array([f"BRK{i:02d}" for i in range(n_brokers)])
+    # Trading concentrates in the large caps, as it does in the real blotters
+    weights = 1 / np.arange(1, n_stocks + 1)
+    stock = rng.choice(n_stocks, n_trades, p=weights / weights.sum())
+    price = np.round(rng.uniform(1, 500, n_stocks)[stock] * rng.normal(1, 0.01, n_trades), 2)
+    volume = rng.integers(1, 500, n_trades).astype("float64") * 100
+    return pd.DataFrame({
+        "Date": dates[rng.integers(0, days, n_trades)],
+        "Classification": sheet[:, 1],
+        "Stock": stocks[stock],
+        "Buy_Sell": rng.choice(["B", "S"], n_trades),
+        "Broker": brokers[rng.integers(0, n_brokers, n_trades)],
+        "Volume": volume,
+        "Price": price,
+        "Value": volume * price,
+        "Fund": sheet[:, 0],
+    })
+
+
+def write_equity_workbook(path, n_trades=20_000, n_stocks=250, n_brokers=40, days=20, seed=0, extra_sheets=("Summary",)):
+    # Equity Monitor upload: one sheet per FUND_SHEET_MAP entry with the REQUIRED_COLUMNS, plus sheets
+    # load_trades must skip. Returns the blotter the workbook holds.
+    trades = make_trades(n_trades, n_stocks, n_brokers, days, seed)
+    columns = ["Date", "Classification", "Stock", "Buy_Sell", "Broker", "Volume", "Price"]
+    wb = openpyxl.Workbook(write_only=True)
+    for fund, names in FUND_SHEET_MAP.items():
+        for name in names:
+            ws = wb.create_sheet(name)
+            ws.append(columns)
+            rows = trades[(trades["Fund"] == fund) & (trades["Classification"] == name.split("_", 1)[1])]
+            cells = rows[columns].astype(object).to_numpy()
+            cells[:, 0] = rows["Date"].dt.to_pydatetime()
+            for row in cells:
+                ws.append(list(row))
+    for name in extra_sheets:
+        wb.create_sheet(name).append(["Not a fund sheet"])
+    wb.save(path)
+    return trades
+
+
+def write_bth_workbook(path, n_tickers=500, years=5, na_rate=0.01, seed=0):
+    rng = np.random.default_rng(seed)
+    ohlc = make_ohlc(n_tickers, years, seed)
+    blocks = [g for _, g in ohlc.groupby("Stock", sort=True)]
+    n_rows = max(len(g) for g in blocks)
+    width = len(blocks) * BLOCK_STRIDE
+
+    grid = np.full((n_rows, width), None, dtype=object)
+    for b, g in enumerate(blocks):
+        col = b * BLOCK_STRIDE
+        cells = g[BTH_COLUMNS].astype(object).to_numpy()
+        cells[:, 0] = pd.to_datetime(g["Date"]).dt.to_pydatetime()
+        # Sprinkle Bloomberg-style #N/A gaps over the price/volume cells
+        gaps = rng.random(cells[:, 1:].shape) < na_rate
+        cells[:, 1:][gaps] = "#N/A N/A"
+        grid[:len(g), col:col + len(BTH_COLUMNS)] = cells
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    ws.append(["Date from", grid[0, 0]])
+    ws.append(["Date to", max(g["Date"].max() for g in blocks)])
+    header, numbers, titles = [None] * width, [None] * width, [None] * width
+    for b, g in enumerate(blocks):
+        col = b * BLOCK_STRIDE
+        numbers[col] = b + 1
+        header[col] = f"{g['Stock'].iloc[0]} PM EQUITY"
+        titles[col:col + len(BTH_COLUMNS)] = BTH_COLUMNS
+    ws.append(numbers)
+    ws.append(header)
+    ws.append(titles)
+    for row in grid:
+        ws.append(list(row))
+    wb.save(path)
+    _add_dimension(path, f"A1:{get_column_letter(width)}{len(grid) + 5}")
+    return path
@@ -0,0 +1,164 @@
+# cache_utils.py
+#
+# Streamlit caches over the query and analysis functions. Every cached call
+# takes the `data_version` returned by db_utils.get_data_version so entries are
+# invalidated whenever the DB file, its WAL or the in-process version counter changes.
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from db_utils import read_database, get_date_bounds, get_stock_list, get_data_version, pick_resolution
+from analytics import (
+    build_panel, build_pivot, daily_returns, volatility, correlation, regression_stats, rolling_beta, IncrementalRolling,
+)
+from equity_utils import (
+    load_trades, filter_trades, trade_cube, read_trades, stored_trade_cube, trade_date_bounds, trade_vwap_vs_market,
+)
+
+CACHE_MAX_ENTRIES = 32
+CACHE_TTL = 3600
+
+# Read mode's initial selection, primed by the warm-up so the first read-mode render is a cache hit
+DEFAULT_STOCK_COUNT = 5
+DEFAULT_COLUMNS = ("Close",)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def cached_date_bounds(db_path, data_version):
+    return get_date_bounds(db_path)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def cached_stock_list(db_path, data_version):
+    return get_stock_list(db_path)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def cached_read_database(db_path, data_version, stocks, date_range, columns, resolution="daily"):
+    return read_database(db_path, stocks=stocks, date_range=date_range, columns=columns, resolution=resolution)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def cached_pivot(db_path, data_version, stocks, date_range, columns, resolution="daily"):
+    # Analyses always build on the daily pivot; coarser ones are for display only
+    filtered_df = cached_read_database(db_path, data_version, stocks, date_range, columns, resolution)
+    return build_pivot(filtered_df, list(columns))
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def cached_panel(db_path, data_version, stocks, date_range, columns, resolution="daily"):
+    # Every selected column side by side, for display when more than one is selected
+    filtered_df = cached_read_database(db_path, data_version, stocks, date_range, columns, resolution)
+    return build_panel(filtered_df, list(columns))
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def cached_daily_returns(db_path, data_version, stocks, date_range, columns):
+    return daily_returns(cached_pivot(db_path, data_version, stocks, date_range, columns))
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def cached_volatility(db_path, data_version, stocks, date_range, columns):
+    return volatility(cached_daily_returns(db_path, data_version, stocks, date_range, columns))
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def cached_correlation(db_path, data_version, stocks, date_range, columns):
+    return correlation(cached_daily_returns(db_path, data_version, stocks, date_range, columns))
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def cached_regression(db_path, data_version, stocks, date_range, columns, benchmark):
+    return regression_stats(cached_daily_returns(db_path, data_version, stocks, date_range, columns), benchmark)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def cached_rolling_beta(db_path, data_version, stocks, date_range, columns, benchmark, window):
+    return rolling_beta(cached_daily_returns(db_path, data_version, stocks, date_range, columns), benchmark, window)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def cached_trades(digest, _data):
+    # Keyed by the upload's content hash (computed once by the caller) rather than by hashing `_data` again
+    return load_trades(_data)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def cached_upload_cube(digest, _data, funds, date_range):
+    return trade_cube(filter_trades(cached_trades(digest, _data), list(funds), *date_range))
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def cached_trade_bounds(db_path, data_version):
+    return trade_date_bounds(db_path)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def cached_trade_rows(db_path, data_version, funds, date_range):
+    return read_trades(db_path, funds, date_range)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def cached_trade_cube(db_path, data_version, funds, date_range):
+    return stored_trade_cube(db_path, funds, date_range)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def cached_trade_vwap(db_path, data_version, funds, date_range):
+    return trade_vwap_vs_market(db_path, funds, date_range)
+
+
+@st.cache_resource
+def _rolling_store():
+    return threading.Lock(), OrderedDict()
+
+
+def cached_rolling_stat(db_path, data_version, stocks, date_range, columns, stat, window, benchmark=None):
+    # Keyed without the end date so sliding the range forward only evaluates the new days
+    key = (db_path, data_version, stocks, date_range[0], columns, stat, window, benchmark)
+    daily_return = cached_daily_returns(db_path, data_version, stocks, date_range, columns)
+    lock, entries = _rolling_store()
+    with lock:
+        roller = entries.pop(key, None) or IncrementalRolling(stat, window, benchmark)
+        entries[key] = roller
+        while len(entries) > CACHE_MAX_ENTRIES:
+            entries.popitem(last=False)
+        return roller.update(daily_return).copy()
+
+
+def _warm_up(db_path, future):
+    try:
+        if not os.path.exists(db_path):
+            from drive_utils import pull_changes, DRIVE_FILE_ID
+
+            if DRIVE_FILE_ID:
+                pull_changes(db_path)
+        if os.path.exists(db_path):
+            data_version = get_data_version(db_path)
+            min_date, max_date = cached_date_bounds(db_path, data_version)
+            if min_date is not None:
+                stocks = cached_stock_list(db_path, data_version)
+                cached_pivot(
+                    db_path, data_version, tuple(stocks[:DEFAULT_STOCK_COUNT]), (min_date, max_date), DEFAULT_COLUMNS,
+                    pick_resolution(min_date, max_date),
+                )
+        future.set_result(True)
+    except Exception as exc:
+        # Drop the cached Future so the next rerun starts a fresh attempt; this run still reports the failure
+        start_warm_up.clear()
+        future.set_exception(exc)
+
+
+@st.cache_resource(show_spinner=False)
+def start_warm_up(db_path):
+    # Once per process, off the script thread: fetch the DB from Drive if it is missing, then prime the
+    # read-mode caches. The returned Future lets the page render right away and wait only where it must.
+    future = Future()
+    thread = threading.Thread(target=_warm_up, args=(db_path, future), name="db-warm-up", daemon=True)
+    add_script_run_ctx(thread, get_script_run_ctx())
+    thread.start()
+    return future
@@ -0,0 +1,521 @@
+# db_utils.py
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote
+
+import pandas as pd
+
+from indicators import INDICATORS, compute_indicators, indicator_lookback
+from perf_utils import trace, traced
+
+DB_FILE_NAME = "ohlc_bbdata.db"
+STOCK_COLUMNS = ["Open", "High", "Low", "Close", "Volume", "Value", "VWAP"]
+INVALID_DATE = "1970-01-01"
+# Loaded frames keep prices as float32 (well inside float32's ~7 significant digits); Value and VWAP stay float64
+PRICE_COLUMNS = ["Open", "High", "Low", "Close"]
+# Per-connection tuning for pooled connections; cache_size is negative to mean KiB
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+SQLITE_CACHE_KIB = 32 * 1024
+SQLITE_BUSY_TIMEOUT = 30  # seconds a writer waits on another process's lock
+READ_POOL_SIZE = 8  # idle read-only connections kept per DB
+READ_CHUNK_ROWS = 50_000  # rows per frame when streaming a query (see iter_database)
+
+STOCK_DATA_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        Stock TEXT,
+        Date TEXT,
+        Open REAL,
+        High REAL,
+        Low REAL,
+        Close REAL,
+        Volume INTEGER,
+        Value REAL,
+        VWAP REAL,
+        PRIMARY KEY (Stock, Date)
+    )
+"""
+
+# Every write to stock_data is logged so drive sync can ship just the changed keys (see sync_utils)
+CHANGE_LOG_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS change_log (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        Stock TEXT,
+        Date TEXT,
+        Op TEXT
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS stock_data_log_insert AFTER INSERT ON stock_data BEGIN
+        INSERT INTO change_log (Stock, Date, Op) VALUES (NEW.Stock, NEW.Date, 'U');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS stock_data_log_update AFTER UPDATE ON stock_data BEGIN
+        INSERT INTO change_log (Stock, Date, Op) VALUES (NEW.Stock, NEW.Date, 'U');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS stock_data_log_delete AFTER DELETE ON stock_data BEGIN
+        INSERT INTO change_log (Stock, Date, Op) VALUES (OLD.Stock, OLD.Date, 'D');
+    END
+    """,
+    "CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT)",
+]
+
+# Weekly/monthly bars kept next to stock_data with the same columns; Date is the period's first day.
+# Each entry is (table, period start, period end) with the SQL date expressions taking {col}.
+ROLLUPS = {
+    "weekly": ("stock_data_weekly", "date({col}, 'weekday 0', '-6 days')", "date({col}, 'weekday 0')"),
+    "monthly": ("stock_data_monthly", "date({col}, 'start of month')", "date({col}, 'start of month', '+1 month', '-1 day')"),
+}
+RESOLUTIONS = ("daily",) + tuple(ROLLUPS)
+# Read mode switches to a coarser resolution once a range would give more bars than this per stock
+RESOLUTION_MAX_POINTS = 500
+
+# First Open, max High, min Low, last Close, summed Volume/Value and VWAP from the sums
+ROLLUP_INSERT = """
+    INSERT INTO {table}
+    SELECT g.Stock, g.Period, o.Open, g.High, g.Low, c.Close, g.Volume, g.Value, ROUND(g.Value / NULLIF(g.Volume, 0), 4)
+    FROM (
+        SELECT d.Stock, p.Period, MIN(d.Date) AS first_date, MAX(d.Date) AS last_date,
+               MAX(d.High) AS High, MIN(d.Low) AS Low, SUM(d.Volume) AS Volume, SUM(d.Value) AS Value
+        FROM temp.rollup_periods p
+        JOIN stock_data d ON d.Stock = p.Stock AND d.Date BETWEEN p.Period AND p.PeriodEnd
+        WHERE d.Date != ?
+        GROUP BY d.Stock, p.Period
+    ) g
+    JOIN stock_data o ON o.Stock = g.Stock AND o.Date = g.first_date
+    JOIN stock_data c ON c.Stock = g.Stock AND c.Date = g.last_date
+"""
+
+# Derived daily series (see indicators.py), one REAL column per registered indicator
+INDICATOR_TABLE = "stock_indicators"
+
+# Per touched stock: its earliest staged date, and the date `lookback` rows before it where the indicators'
+# input starts; COALESCE falls back to the stock's first row when its history is shorter than that
+INDICATOR_STARTS = """
+    CREATE TEMP TABLE indicator_starts AS
+    SELECT k.Stock, k.first_date, COALESCE((
+        SELECT p.Date FROM stock_data p
+        WHERE p.Stock = k.Stock AND p.Date < k.first_date AND p.Date != ?
+        ORDER BY p.Date DESC LIMIT 1 OFFSET ?
+    ), '') AS tail_start
+    FROM (SELECT Stock, MIN(Date) AS first_date FROM temp.changed_keys GROUP BY Stock) k
+"""
+INDICATOR_SOURCE = f"""
+    SELECT d.Stock, d.Date, {', '.join(f'd.{col}' for col in STOCK_COLUMNS)}
+    FROM temp.indicator_starts k
+    JOIN stock_data d ON d.Stock = k.Stock AND d.Date >= k.tail_start
+    WHERE d.Date != ?
+    ORDER BY d.Stock, d.Date
+"""
+
+# Bumped on every in-process write so caches keyed on get_data_version() drop stale entries
+_data_version = 0
+
+
+def bump_data_version():
+    global _data_version
+    _data_version += 1
+    return _data_version
+
+
+def _file_version(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return (None, None)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def get_data_version(db_path):
+    # In WAL mode another process's commit (a CLI ingest, a sync pull) only appends to the -wal file and leaves
+    # the main file untouched until a checkpoint, so both files are part of the key
+    return _file_version(db_path) + _file_version(f"{db_path}-wal") + (_data_version,)
+
+
+class ConnectionPool:
+    # Process-wide connections for one DB file: read-only (mode=ro) readers handed out one thread at a
+    # time, and a single writer serialized by a lock. WAL lets the readers run while the writer commits.
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.pid = os.getpid()
+        self.closed = False
+        self._idle = []
+        self._idle_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._writer = None
+
+    def _tune(self, conn):
+        conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KIB}")
+        return conn
+
+    def _connect_reader(self):
+        uri = f"file:{quote(os.path.abspath(self.db_path))}?mode=ro"
+        return self._tune(sqlite3.connect(uri, uri=True, check_same_thread=False, timeout=SQLITE_BUSY_TIMEOUT))
+
+    def _connect_writer(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=SQLITE_BUSY_TIMEOUT)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return self._tune(conn)
+
+    @contextmanager
+    def reader(self):
+        with self._idle_lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._connect_reader()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            with self._idle_lock:
+                keep = not self.closed and len(self._idle) < READ_POOL_SIZE
+                if keep:
+                    self._idle.append(conn)
+            if not keep:
+                conn.close()
+
+    @contextmanager
+    def writer(self):
+        with self._write_lock:
+            if self.closed:
+                raise sqlite3.ProgrammingError(f"Connection pool for {self.db_path} is closed")
+            if self._writer is None:
+                self._writer = self._connect_writer()
+            try:
+                yield self._writer
+            finally:
+                if self._writer.in_transaction:
+                    self._writer.rollback()
+
+    def close(self):
+        # Waits for an in-flight write; readers still in use are closed when they are returned
+        with self._write_lock:
+            self.closed = True
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        with self._idle_lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path):
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        # sqlite connections must not cross a fork, so a child process starts its own pool
+        if pool is None or pool.closed or pool.pid != os.getpid():
+            pool = _pools[key] = ConnectionPool(db_path)
+        return pool
+
+
+def close_pool(db_path=None):
+    # Drop pooled connections, e.g. before the DB file is replaced on disk; None closes every pool
+    with _pools_lock:
+        keys = list(_pools) if db_path is None else [os.path.abspath(db_path)]
+        pools = [_pools.pop(key) for key in keys if key in _pools]
+    for pool in pools:
+        if pool.pid == os.getpid():
+            pool.close()
+
+
+def _table_columns(conn, table):
+    # Empty when the table does not exist
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def ensure_schema(conn):
+    conn.execute(STOCK_DATA_SCHEMA.format(table="stock_data"))
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_stock_data_date ON stock_data (Date)")
+    for statement in CHANGE_LOG_SCHEMA:
+        conn.execute(statement)
+    rollups_missing = False
+    for table, _, _ in ROLLUPS.values():
+        if not _table_columns(conn, table):
+            conn.execute(STOCK_DATA_SCHEMA.format(table=table))
+            rollups_missing = True
+
+    existing = _table_columns(conn, INDICATOR_TABLE)
+    if not existing:
+        columns = "".join(f"{name} REAL, " for name in INDICATORS)
+        conn.execute(f"CREATE TABLE {INDICATOR_TABLE} (Stock TEXT, Date TEXT, {columns}PRIMARY KEY (Stock, Date))")
+    else:
+        for name in INDICATORS:
+            if name not in existing:
+                conn.execute(f"ALTER TABLE {INDICATOR_TABLE} ADD COLUMN {name} REAL")
+    indicators_missing = any(name not in existing for name in INDICATORS)
+
+    if rollups_missing or indicators_missing:
+        # DB predates the rollups or a newly registered indicator: build them once from everything already stored
+        stage_changed_keys(conn, "SELECT Stock, Date FROM stock_data")
+        if rollups_missing:
+            refresh_rollups(conn)
+        if indicators_missing:
+            refresh_indicators(conn)
+        conn.execute("DROP TABLE temp.changed_keys")
+
+
+def stage_changed_keys(conn, select, params=()):
+    # `select` yields the (Stock, Date) keys a write is about to touch; see refresh_derived
+    conn.execute("DROP TABLE IF EXISTS temp.changed_keys")
+    conn.execute(f"CREATE TEMP TABLE changed_keys AS {select}", params)
+
+
+def refresh_derived(conn):
+    # Brings the rollups and indicators in line with stock_data after a write to the staged keys
+    refresh_rollups(conn)
+    refresh_indicators(conn)
+    conn.execute("DROP TABLE temp.changed_keys")
+
+
+@traced()
+def refresh_rollups(conn):
+    # Recomputes only the weekly/monthly bars whose period holds a staged key; periods left empty are dropped
+    for table, start, end in ROLLUPS.values():
+        conn.execute("DROP TABLE IF EXISTS temp.rollup_periods")
+        conn.execute(
+            f"CREATE TEMP TABLE rollup_periods AS SELECT DISTINCT Stock, "
+            f"{start.format(col='Date')} AS Period, {end.format(col='Date')} AS PeriodEnd FROM temp.changed_keys"
+        )
+        conn.execute(f"DELETE FROM {table} WHERE (Stock, Date) IN (SELECT Stock, Period FROM temp.rollup_periods)")
+        conn.execute(ROLLUP_INSERT.format(table=table), (INVALID_DATE,))
+    conn.execute("DROP TABLE temp.rollup_periods")
+
+
+@traced()
+def refresh_indicators(conn):
+    # A changed row shifts every later indicator value within the lookback, so each touched stock is
+    # recomputed from its earliest staged date on; for an append that is just the new rows
+    conn.execute("DROP TABLE IF EXISTS temp.indicator_starts")
+    conn.execute(INDICATOR_STARTS, (INVALID_DATE, max(indicator_lookback() - 1, 0)))
+    conn.execute(
+        f"DELETE FROM {INDICATOR_TABLE} WHERE rowid IN ("
+        f"SELECT i.rowid FROM temp.indicator_starts k JOIN {INDICATOR_TABLE} i ON i.Stock = k.Stock AND i.Date >= k.first_date)"
+    )
+    source = pd.read_sql(INDICATOR_SOURCE, conn, params=(INVALID_DATE,))
+    if not source.empty:
+        starts = dict(conn.execute("SELECT Stock, first_date FROM temp.indicator_starts").fetchall())
+        values = compute_indicators(source)
+        # The lookback rows were only context; their stored values are unchanged
+        values = values[values["Date"] >= values["Stock"].map(starts)]
+        columns = ["Stock", "Date"] + list(INDICATORS)
+        conn.executemany(
+            f"INSERT INTO {INDICATOR_TABLE} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            to_sql_rows(values, columns),
+        )
+    conn.execute("DROP TABLE temp.indicator_starts")
+
+
+def pick_resolution(start, end):
+    # Finest resolution that keeps the range under RESOLUTION_MAX_POINTS bars per stock
+    days = (pd.Timestamp(str(end)) - pd.Timestamp(str(start))).days + 1
+    bars = {"daily": days * 5 / 7, "weekly": days / 7, "monthly": days / 30.4}
+    return next((r for r in RESOLUTIONS if bars[r] <= RESOLUTION_MAX_POINTS), RESOLUTIONS[-1])
+
+
+def to_sql_rows(df, columns):
+    # Python scalars with NaN/NA as None, in `columns` order, for executemany
+    rows = df[columns].assign(Date=df["Date"].astype(str)).astype(object)
+    return rows.where(rows.notna(), None).itertuples(index=False, name=None)
+
+
+def prepare_stock_data(df):
+    # Clean and convert Date
+    df = df.dropna(subset=["Stock", "Date"]).copy()
+    df["Date"] = pd.to_datetime(df["Date"], errors="coerce").dt.date
+    df = df.dropna(subset=["Date"])  # Remove rows with invalid Date
+    df = df[df["Date"] != pd.to_datetime(INVALID_DATE).date()]  # Explicitly remove 1970-01-01
+
+    if df.empty:
+        return df
+
+    # Coerce numerics and calculate VWAP
+    for col in STOCK_COLUMNS[:-1]:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    df["VWAP"] = (df["Value"] / df["Volume"]).round(4)
+    return df.drop_duplicates(subset=["Stock", "Date"])
+
+
+def save_to_db(df, db_path, on_conflict="ignore"):
+    if on_conflict not in ("ignore", "update"):
+        raise ValueError(f"Unknown on_conflict mode: {on_conflict}")
+
+    df = prepare_stock_data(df)
+    if df.empty:
+        return pd.DataFrame()  # Nothing to insert
+
+    columns = ["Stock", "Date"] + STOCK_COLUMNS
+    rows = to_sql_rows(df, columns)
+    placeholders = ", ".join("?" * len(columns))
+
+    with trace("save_to_db", rows=len(df)), get_pool(db_path).writer() as conn, conn:
+        conn.execute("BEGIN")
+        ensure_schema(conn)
+        # Stage the batch so dedupe and the new-row report only touch keys in this upload
+        conn.execute("DROP TABLE IF EXISTS temp.staging")
+        conn.execute(STOCK_DATA_SCHEMA.format(table="temp.staging"))
+        conn.executemany(f"INSERT OR IGNORE INTO temp.staging VALUES ({placeholders})", rows)
+
+        new_rows = """
+            FROM temp.staging s
+            WHERE NOT EXISTS (
+                SELECT 1 FROM stock_data d WHERE d.Stock = s.Stock AND d.Date = s.Date
+            )
+        """
+        new_data = pd.read_sql(f"SELECT s.* {new_rows}", conn)
+        # Only the periods and indicator tails of rows this batch writes get recomputed
+        stage_changed_keys(
+            conn, "SELECT Stock, Date FROM temp.staging" if on_conflict == "update" else f"SELECT s.Stock, s.Date {new_rows}"
+        )
+
+        if on_conflict == "update":
+            updates = ", ".join(f"{col} = excluded.{col}" for col in STOCK_COLUMNS)
+            conn.execute(
+                f"INSERT INTO stock_data SELECT * FROM temp.staging WHERE true "
+                f"ON CONFLICT (Stock, Date) DO UPDATE SET {updates}"
+            )
+        else:
+            conn.execute("INSERT OR IGNORE INTO stock_data SELECT * FROM temp.staging")
+        refresh_derived(conn)
+        conn.execute("DROP TABLE temp.staging")
+
+    bump_data_version()
+    new_data["Date"] = pd.to_datetime(new_data["Date"]).dt.date
+    return new_data
+
+
+def delete_records(db_path, date, stock=None):
+    if stock is None:
+        where, params = "Date = ?", (str(date),)
+    else:
+        where, params = "Stock = ? AND Date = ?", (stock, str(date))
+    with get_pool(db_path).writer() as conn:
+        conn.execute("BEGIN")
+        ensure_schema(conn)
+        stage_changed_keys(conn, f"SELECT Stock, Date FROM stock_data WHERE {where}", params)
+        deleted = conn.execute(f"DELETE FROM stock_data WHERE {where}", params).rowcount
+        refresh_derived(conn)
+        conn.commit()
+    bump_data_version()
+    return deleted
+
+
+def _build_where(stocks=None, date_range=None, start_expr="?"):
+    clauses, params = ["Date != ?"], [INVALID_DATE]
+    if stocks is not None:
+        stocks = list(stocks)
+        clauses.append(f"Stock IN ({', '.join('?' * len(stocks))})")
+        params.extend(stocks)
+    if date_range is not None:
+        start, end = date_range
+        clauses.append(f"Date BETWEEN {start_expr} AND ?")
+        params.extend([str(start), str(end)])
+    return " WHERE " + " AND ".join(clauses), params
+
+
+def compact_stock_frame(df):
+    # Native dtypes for loaded rows: datetime64 Date, categorical Stock, float32 prices, nullable Int64 Volume
+    df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+    df = df.dropna(subset=["Date"]).reset_index(drop=True)
+    df["Stock"] = df["Stock"].astype("category")
+    for col in PRICE_COLUMNS:
+        if col in df:
+            df[col] = df[col].astype("float32")
+    if "Volume" in df:
+        df["Volume"] = pd.to_numeric(df["Volume"]).round().astype("Int64")
+    return df
+
+
+def _stock_query(db_path, stocks=None, date_range=None, columns=None, resolution="daily"):
+    # The SELECT behind read_database and iter_database, plus the value columns it returns
+    # Only project known columns so the list can be interpolated safely
+    indicators = [] if columns is None else [c for c in INDICATORS if c in columns]
+    columns = STOCK_COLUMNS if columns is None else [c for c in STOCK_COLUMNS if c in columns]
+    if indicators and resolution != "daily":
+        raise ValueError("Indicators are only stored for daily rows")
+    select = ", ".join(["Stock", "Date"] + columns + indicators)
+
+    table, start_expr = "stock_data", "?"
+    if resolution != "daily":
+        table, period_start, _ = ROLLUPS[resolution]
+        start_expr = period_start.format(col="?")
+    where, params = _build_where(stocks, date_range, start_expr)
+    source = f"{table} LEFT JOIN {INDICATOR_TABLE} USING (Stock, Date)" if indicators else table
+
+    pool = get_pool(db_path)
+    with pool.reader() as conn:
+        missing = (table != "stock_data" and not _table_columns(conn, table)) or not set(indicators).issubset(
+            _table_columns(conn, INDICATOR_TABLE)
+        )
+    if missing:
+        # DB was last written before these rollups or indicators existed (e.g. a fresh Drive download): build them once
+        with pool.writer() as conn, conn:
+            conn.execute("BEGIN")  # DDL would otherwise autocommit and expose the empty tables
+            ensure_schema(conn)
+    return f"SELECT {select} FROM {source}{where}", params, columns + indicators
+
+
+@traced(rows=len)
+def read_database(db_path, stocks=None, date_range=None, columns=None, compact=True, resolution="daily"):
+    # resolution="weekly"/"monthly" reads the rollup bars, including the period the range starts in.
+    # `columns` may name registered indicators, which are read from stock_indicators for daily rows.
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown resolution: {resolution}")
+    if not os.path.exists(db_path):
+        return pd.DataFrame()
+
+    sql, params, _ = _stock_query(db_path, stocks, date_range, columns, resolution)
+    with get_pool(db_path).reader() as conn:
+        df = pd.read_sql(sql, conn, params=params)
+
+    if compact:
+        return compact_stock_frame(df)
+    df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+    return df.dropna(subset=["Date"]).reset_index(drop=True)
+
+
+def iter_database(db_path, stocks=None, date_range=None, columns=None, resolution="daily", chunk_rows=READ_CHUNK_ROWS):
+    # read_database's full-precision rows, ordered by (Stock, Date), as frames of at most `chunk_rows` rows, so
+    # exports never hold the whole result. Dtypes are fixed up front (Int64 Volume, float64 values) so a chunk
+    # whose column happens to be all NULL still matches the others.
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown resolution: {resolution}")
+    if not os.path.exists(db_path):
+        return
+    sql, params, values = _stock_query(db_path, stocks, date_range, columns, resolution)
+    dtype = {col: "Int64" if col == "Volume" else "float64" for col in values}
+    with get_pool(db_path).reader() as conn:
+        for chunk in pd.read_sql(f"{sql} ORDER BY Stock, Date", conn, params=params, chunksize=chunk_rows, dtype=dtype):
+            chunk["Date"] = pd.to_datetime(chunk["Date"], errors="coerce")
+            yield chunk.dropna(subset=["Date"]).reset_index(drop=True)
+
+
+def get_date_bounds(db_path):
+    with get_pool(db_path).reader() as conn:
+        min_date, max_date = conn.execute(
+            "SELECT MIN(Date), MAX(Date) FROM stock_data WHERE Date != ?", (INVALID_DATE,)
+        ).fetchone()
+    if min_date is None:
+        return None, None
+    return pd.to_datetime(min_date).date(), pd.to_datetime(max_date).date()
+
+
+def get_stock_list(db_path):
+    with get_pool(db_path).reader() as conn:
+        stocks = [row[0] for row in conn.execute("SELECT DISTINCT Stock FROM stock_data ORDER BY Stock")]
+    return stocks
@@ -2,41 +2,389 @@
 
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload, MediaFileUpload
-import streamlit as st
+from googleapiclient.http import HttpRequest, MediaIoBaseDownload, MediaFileUpload, MediaIoBaseUpload
+from functools import lru_cache
+from db_utils import bump_data_version, close_pool, get_pool
+from equity_utils import read_trades, save_trades
+from perf_utils import traced
+from sync_utils import get_applied_changeset, export_changeset, mark_pushed, apply_changeset, checkpoint, clear_change_log
+from contextlib import closing
+import hashlib
+import httplib2
 import io
+import json
 import os
+import re
+import sqlite3
+import tempfile
+import uuid
+import zlib
+from datetime import datetime, timezone
 
-@st.cache_resource
+try:
+    import zstandard
+except ImportError:  # optional: snapshots fall back to gzip
+    zstandard = None
+
+DRIVE_FOLDER_ID = "1ajjaIMmHobK-kU0NxUfk_cBrhy7ZPGmR"
+DRIVE_FILE_ID = "1FWoXxyUSgnOZkC7Gxt_Vjpco0G2L1VJo"
+DRIVE_SCOPES = ["https://www.googleapis.com/auth/drive"]
+
+CHANGESET_PREFIX = "ohlc_changeset_"
+CHANGESET_NAME = CHANGESET_PREFIX + "{seq:06d}.csv.gz"
+CHANGESET_PATTERN = re.compile(re.escape(CHANGESET_PREFIX) + r"(\d+)\.csv\.gz$")
+
+# Transfers go in resumable chunks (a multiple of 256 KiB), each retried with backoff
+DRIVE_CHUNK_SIZE = 8 * 1024 * 1024
+DRIVE_RETRIES = 5
+SNAPSHOT_ENCODINGS = ("zstd", "gzip")
+SNAPSHOT_COPY_SIZE = 1024 * 1024
+PUSH_ATTEMPTS = 5  # a push that loses the race for a sequence number retries with the next one
+
+@lru_cache(maxsize=None)
 def get_drive_service():
-    credentials = service_account.Credentials.from_service_account_info(
-        st.secrets["google_drive"],
-        scopes=["https://www.googleapis.com/auth/drive"]
-    )
+    # A service-account JSON file (CLI / cron) takes precedence over the apps' Streamlit secrets
+    credentials_file = os.environ.get("GOOGLE_DRIVE_CREDENTIALS")
+    if credentials_file:
+        credentials = service_account.Credentials.from_service_account_file(credentials_file, scopes=DRIVE_SCOPES)
+    else:
+        import streamlit as st
+        credentials = service_account.Credentials.from_service_account_info(st.secrets["google_drive"], scopes=DRIVE_SCOPES)
     return build("drive", "v3", credentials=credentials)
 
-def download_db_from_drive(file_id, destination_path):
-    service = get_drive_service()
+class _SnapshotWriter:
+    # File-like sink for MediaIoBaseDownload: hashes the bytes as received and decompresses them on the fly
+    def __init__(self, fh, encoding):
+        self.fh = fh
+        self.sha256 = hashlib.sha256()
+        if encoding == "zstd":
+            if zstandard is None:
+                raise RuntimeError("This snapshot is zstd-compressed; install zstandard to download it")
+            self.decompressor = zstandard.ZstdDecompressor().decompressobj()
+        elif encoding == "gzip":
+            self.decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+        else:  # Snapshots uploaded before compression are the raw SQLite file
+            self.decompressor = None
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.fh.write(self.decompressor.decompress(data) if self.decompressor else data)
+        return len(data)
+
+    def close(self):
+        if self.decompressor is not None:
+            self.fh.write(self.decompressor.flush())
+
+def _compress_file(source_path, target_path, encoding):
+    sha256 = hashlib.sha256()
+    compressor = (
+        zstandard.ZstdCompressor(level=10).compressobj() if encoding == "zstd"
+        else zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    )
+    with open(source_path, "rb") as src, open(target_path, "wb") as dst:
+        while chunk := src.read(SNAPSHOT_COPY_SIZE):
+            data = compressor.compress(chunk)
+            sha256.update(data)
+            dst.write(data)
+        data = compressor.flush()
+        sha256.update(data)
+        dst.write(data)
+    return sha256.hexdigest()
+
+def make_snapshot(db_path, target_path, encoding=None):
+    # Consistent, defragmented copy of the live DB (WAL included) via VACUUM INTO, then compressed.
+    # Returns the Drive appProperties describing the snapshot, and the last change_log seq it contains.
+    encoding = encoding or ("zstd" if zstandard is not None else "gzip")
+    if encoding not in SNAPSHOT_ENCODINGS:
+        raise ValueError(f"Unknown snapshot encoding: {encoding}")
+    if encoding == "zstd" and zstandard is None:
+        raise RuntimeError("zstd snapshots need the zstandard package (pip install zstandard)")
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(target_path))) as tmp:
+        vacuumed = os.path.join(tmp, "snapshot.db")
+        with get_pool(db_path).reader() as conn:
+            conn.execute("VACUUM INTO ?", (vacuumed,))
+        # The base carries those rows itself; a pending log in it would make every client that downloads
+        # it push them all again as its first changeset
+        with closing(sqlite3.connect(vacuumed)) as conn, conn:
+            contained = clear_change_log(conn)
+        raw_size = os.path.getsize(vacuumed)
+        sha256 = _compress_file(vacuumed, target_path, encoding)
+    return {"encoding": encoding, "sha256": sha256, "raw_size": str(raw_size)}, contained
+
+@traced()
+def download_db_from_drive(file_id, destination_path, service=None, chunk_size=DRIVE_CHUNK_SIZE, retries=DRIVE_RETRIES):
+    service = service or get_drive_service()
+    properties = service.files().get(fileId=file_id, fields="appProperties").execute().get("appProperties") or {}
     request = service.files().get_media(fileId=file_id)
-    fh = io.FileIO(destination_path, "wb")
-    downloader = MediaIoBaseDownload(fh, request)
-    done = False
-    while done is False:
-        status, done = downloader.next_chunk()
 
-def upload_db_to_drive(file_path, folder_id):
-    service = get_drive_service()
-    file_metadata = {"name": os.path.basename(file_path), "parents": [folder_id]}
-    media = MediaFileUpload(file_path, mimetype="application/octet-stream", resumable=True)
+    # Stream into a temp file next to the destination and only rename it into place once verified,
+    # so an interrupted or corrupt download never leaves a half-written DB behind
+    partial_path = destination_path + ".download"
+    try:
+        with open(partial_path, "wb") as fh:
+            writer = _SnapshotWriter(fh, properties.get("encoding"))
+            downloader = MediaIoBaseDownload(writer, request, chunksize=chunk_size)
+            done = False
+            while done is False:
+                status, done = downloader.next_chunk(num_retries=retries)
+            writer.close()
+        expected = properties.get("sha256")
+        if expected and writer.sha256.hexdigest() != expected:
+            raise IOError(f"Checksum mismatch downloading {file_id}: expected {expected}, got {writer.sha256.hexdigest()}")
+        # Pooled connections still point at the old file; closing them also folds its WAL back in
+        close_pool(destination_path)
+        os.replace(partial_path, destination_path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    # A WAL left over from the previous file must not be replayed onto the new one
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(destination_path + suffix):
+            os.remove(destination_path + suffix)
+    close_pool(destination_path)
+    bump_data_version()
+
+def upload_db_to_drive(file_path, folder_id, service=None, encoding=None, chunk_size=DRIVE_CHUNK_SIZE, retries=DRIVE_RETRIES):
+    service = service or get_drive_service()
 
     # Check if file already exists
     query = f"'{folder_id}' in parents and name = '{os.path.basename(file_path)}' and trashed = false"
     existing = service.files().list(q=query, fields="files(id)").execute()
 
+    # Publish pending edits as a changeset first so clients that only pull deltas still see them
     if existing["files"]:
-        file_id = existing["files"][0]["id"]
-        file = service.files().update(fileId=file_id, media_body=media).execute()
-    else:
-        file = service.files().create(body=file_metadata, media_body=media, fields="id").execute()
+        push_changes(file_path, folder_id, existing["files"][0]["id"], service)
+
+    # The Drive file keeps its name and ID; appProperties say how to decode and verify it
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_path = os.path.join(tmp, "snapshot")
+        properties, contained = make_snapshot(file_path, snapshot_path, encoding)
+        media = MediaFileUpload(
+            snapshot_path, mimetype=f"application/{properties['encoding']}", chunksize=chunk_size, resumable=True
+        )
+        if existing["files"]:
+            file_id = existing["files"][0]["id"]
+            request = service.files().update(
+                fileId=file_id, body={"appProperties": properties}, media_body=media, fields="id"
+            )
+        else:
+            file_metadata = {"name": os.path.basename(file_path), "parents": [folder_id], "appProperties": properties}
+            request = service.files().create(body=file_metadata, media_body=media, fields="id")
+        file = None
+        while file is None:
+            status, file = request.next_chunk(num_retries=retries)
+    if not existing["files"]:
+        # A new base has no delta clients yet, so the local edits it contains never need a changeset. On an
+        # update the push above already shipped them; anything logged since stays pending for the next push.
+        mark_pushed(file_path, contained)
+
+    # The snapshot now contains every changeset up to its watermark, so those can go. The newest one is
+    # kept as the high-water mark: clients behind it see the gap and re-download the base instead.
+    applied = get_applied_changeset(file_path)
+    changesets = list_changesets(folder_id, service)
+    newest = changesets[-1][1] if changesets else None
+    for seq, _, changeset_id in _changeset_files(folder_id, service):
+        if seq <= applied and changeset_id != newest:
+            service.files().delete(fileId=changeset_id).execute()
 
     return file["id"]
+
+def _changeset_files(folder_id, service, name=None):
+    # [(seq, createdTime, file_id)] for every changeset file, duplicates of a sequence number included
+    name_clause = f"name = '{name}'" if name else f"name contains '{CHANGESET_PREFIX}'"
+    query = f"'{folder_id}' in parents and {name_clause} and trashed = false"
+    files, page_token = [], None
+    while True:
+        page = service.files().list(
+            q=query, fields="nextPageToken, files(id, name, createdTime)", pageSize=1000, pageToken=page_token
+        ).execute()
+        for item in page.get("files", []):
+            match = CHANGESET_PATTERN.match(item["name"])
+            if match:
+                files.append((int(match.group(1)), item.get("createdTime", ""), item["id"]))
+        page_token = page.get("nextPageToken")
+        if not page_token:
+            return sorted(files)
+
+def list_changesets(folder_id, service=None):
+    # [(seq, file_id)] in sequence order. Drive allows duplicate names, so two clients pushing at once can
+    # both upload the same sequence number; the earliest upload (by createdTime, then ID) is the one that counts.
+    service = service or get_drive_service()
+    changesets = {}
+    for seq, _, changeset_id in _changeset_files(folder_id, service):
+        changesets.setdefault(seq, changeset_id)
+    return sorted(changesets.items())
+
+def pull_changes(db_path, folder_id=DRIVE_FOLDER_ID, file_id=DRIVE_FILE_ID, service=None):
+    # Replays remote changesets newer than the local watermark; returns how many were applied
+    service = service or get_drive_service()
+    changesets = list_changesets(folder_id, service)
+    have_db = os.path.exists(db_path)
+    applied = get_applied_changeset(db_path) if have_db else 0
+
+    local_changes = local_trades = None
+    if not have_db or (changesets and changesets[0][0] > applied + 1):
+        # No local copy, or the changesets we need were folded into a newer base snapshot:
+        # rebase onto the snapshot and re-apply any unpushed local edits on top
+        if have_db:
+            local_changes, _ = export_changeset(db_path)
+            # Stored trades are not in changesets; they are carried over and win for the (Date, Fund)s they cover
+            local_trades = read_trades(db_path)
+            checkpoint(db_path)
+        download_db_from_drive(file_id, db_path, service)
+        applied = get_applied_changeset(db_path)
+        if local_trades is not None:
+            save_trades(local_trades, db_path)
+
+    pending = [(seq, changeset_id) for seq, changeset_id in changesets if seq > applied]
+    for seq, changeset_id in pending:
+        apply_changeset(db_path, service.files().get_media(fileId=changeset_id).execute(), seq)
+    if local_changes is not None:
+        apply_changeset(db_path, local_changes)
+    return len(pending)
+
+def push_changes(db_path, folder_id=DRIVE_FOLDER_ID, file_id=DRIVE_FILE_ID, service=None):
+    # Uploads pending local edits as the next changeset; returns its name, or None if nothing changed
+    service = service or get_drive_service()
+    for _ in range(PUSH_ATTEMPTS):
+        pull_changes(db_path, folder_id, file_id, service)
+        data, last_seq = export_changeset(db_path)
+        if data is None:
+            return None
+
+        seq = get_applied_changeset(db_path) + 1
+        name = CHANGESET_NAME.format(seq=seq)
+        media = MediaIoBaseUpload(io.BytesIO(data), mimetype="application/gzip")
+        created = service.files().create(
+            body={"name": name, "parents": [folder_id]}, media_body=media, fields="id"
+        ).execute()
+        # Another client may have pushed the same sequence number meanwhile. Only the earliest upload counts
+        # (see list_changesets), so a later one withdraws, pulls the winner and retries with the next number.
+        if _changeset_files(folder_id, service, name)[0][2] == created["id"]:
+            mark_pushed(db_path, last_seq, seq)
+            return name
+        service.files().delete(fileId=created["id"]).execute()
+    raise RuntimeError(f"Gave up pushing after {PUSH_ATTEMPTS} attempts: other clients kept taking the next changeset")
+
+
+class LocalDriveService:
+    # The subset of the Drive v3 files() API used above, backed by a local directory. A file's ID is its name;
+    # like Drive, several files may share a name, and the later ones get a unique ID. Lets the sync run
+    # offline or against a shared folder, and stands in for Drive when testing.
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def files(self):
+        return self
+
+    def _path(self, file_id):
+        return os.path.join(self.root, os.path.basename(file_id))
+
+    def _properties_path(self, file_id):
+        return os.path.join(self.root, "." + os.path.basename(file_id) + ".appProperties.json")
+
+    def _meta_path(self, file_id):
+        return os.path.join(self.root, "." + os.path.basename(file_id) + ".meta.json")
+
+    def _meta(self, file_id):
+        # Name and createdTime; files copied in by hand have neither recorded and are named by their ID
+        try:
+            with open(self._meta_path(file_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            created = datetime.fromtimestamp(os.path.getmtime(self._path(file_id)), timezone.utc)
+            return {"name": os.path.basename(file_id), "createdTime": created.isoformat()}
+
+    def _claim(self, name):
+        # Reserves a new file ID for `name` by creating its metadata exclusively, so concurrent creates never share one
+        file_id = os.path.basename(name)
+        while True:
+            if not os.path.exists(self._path(file_id)):
+                try:
+                    with open(self._meta_path(file_id), "x") as f:
+                        json.dump({"name": os.path.basename(name), "createdTime": datetime.now(timezone.utc).isoformat()}, f)
+                    return file_id
+                except FileExistsError:
+                    pass
+            file_id = f"{os.path.basename(name)}.{uuid.uuid4().hex[:8]}"
+
+    def _write(self, file_id, media_body, body):
+        # Written aside and renamed into place, so a concurrent reader never sees a partial file
+        partial = os.path.join(self.root, f".{os.path.basename(file_id)}.{uuid.uuid4().hex}.partial")
+        with open(partial, "wb") as f:
+            f.write(media_body.getbytes(0, media_body.size()))
+        os.replace(partial, self._path(file_id))
+        properties = (body or {}).get("appProperties")
+        if properties is not None:
+            with open(self._properties_path(file_id), "w") as f:
+                json.dump(properties, f)
+        return {"id": file_id}
+
+    def list(self, q="", fields=None, pageSize=None, pageToken=None, **kwargs):
+        def list_files():
+            files = []
+            for file_id in sorted(n for n in os.listdir(self.root) if not n.startswith(".")):
+                try:
+                    files.append({"id": file_id, **self._meta(file_id)})
+                except FileNotFoundError:  # deleted while listing
+                    pass
+            for op, value in re.findall(r"name (=|contains) '([^']*)'", q):
+                files = [f for f in files if (f["name"] == value if op == "=" else f["name"].startswith(value))]
+            return {"files": files}
+        return _LocalCall(list_files)
+
+    def get(self, fileId, fields=None, **kwargs):
+        def get():
+            properties = {}
+            if os.path.exists(self._properties_path(fileId)):
+                with open(self._properties_path(fileId)) as f:
+                    properties = json.load(f)
+            return {"id": fileId, "name": self._meta(fileId)["name"], "appProperties": properties}
+        return _LocalCall(get)
+
+    def create(self, body, media_body=None, fields=None, **kwargs):
+        return _LocalCall(lambda: self._write(self._claim(body["name"]), media_body, body))
+
+    def update(self, fileId, media_body=None, body=None, **kwargs):
+        return _LocalCall(lambda: self._write(fileId, media_body, body))
+
+    def delete(self, fileId, **kwargs):
+        def delete():
+            os.remove(self._path(fileId))
+            for path in (self._meta_path(fileId), self._properties_path(fileId)):
+                if os.path.exists(path):
+                    os.remove(path)
+        return _LocalCall(delete)
+
+    def get_media(self, fileId, **kwargs):
+        # A real HttpRequest so both .execute() and MediaIoBaseDownload work unchanged
+        return HttpRequest(_LocalHttp(), lambda resp, content: content, self._path(fileId))
+
+
+class _LocalCall:
+    # Deferred like a googleapiclient request: nothing happens until execute() / next_chunk()
+    def __init__(self, func):
+        self.func = func
+
+    def execute(self, **kwargs):
+        return self.func()
+
+    def next_chunk(self, **kwargs):
+        return None, self.func()
+
+
+class _LocalHttp:
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        with open(uri, "rb") as f:
+            data = f.read()
+        byte_range = (headers or {}).get("range")
+        if byte_range is None:
+            return httplib2.Response({"status": 200, "content-length": str(len(data))}), data
+        if not data:
+            return httplib2.Response({"status": 416, "content-range": "bytes */0"}), b""
+        start, end = (int(v) for v in byte_range.split("=")[1].split("-"))
+        chunk = data[start:end + 1]
+        content_range = f"bytes {start}-{start + len(chunk) - 1}/{len(data)}"
+        return httplib2.Response({"status": 206, "content-range": content_range}), chunk
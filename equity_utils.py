@@ -0,0 +1,250 @@
+# equity_utils.py
+#
+# Trade blotter loading for the Equity Monitor: one normalized table of every
+# fund sheet in a workbook, parsed once and then filtered per rerun. Blotters
+# can be stored in a `trades` table next to stock_data so summaries over any
+# date range are SQL GROUP BYs instead of re-uploads.
+
+import importlib.util
+import io
+
+import pandas as pd
+
+from db_utils import get_pool, ensure_schema, to_sql_rows, bump_data_version, READ_CHUNK_ROWS
+from perf_utils import traced
+
+FUND_SHEET_MAP = {
+    "SSS": ["SSS_FVTPL", "SSS_FVTOCI"],
+    "EC": ["EC_FVTPL", "EC_FVTOCI"],
+    "MPF": ["MPF_FVTPL"],
+    "NVPF": ["NVPF_FVTPL"],
+}
+REQUIRED_COLUMNS = {"Date", "Classification", "Stock", "Buy_Sell", "Broker", "Volume", "Price"}
+TRADE_DTYPES = {
+    "Classification": str, "Stock": str, "Buy_Sell": str, "Broker": str, "Volume": "float64", "Price": "float64",
+}
+
+TRADE_COLUMNS = ["Date", "Fund", "Classification", "Stock", "Buy_Sell", "Broker", "Volume", "Price", "Value"]
+# Columns the summaries may group by; also what makes interpolating them into SQL safe
+TRADE_GROUPS = ("Date", "Fund", "Classification", "Stock", "Buy_Sell", "Broker")
+# Low-cardinality labels held as pandas categoricals so grouping compares integer codes, not strings
+CATEGORICAL_COLUMNS = ["Fund", "Classification", "Stock", "Buy_Sell", "Broker"]
+# Finest grain any Equity Monitor summary or chart needs; see trade_cube
+CUBE_KEYS = ["Date", "Fund", "Buy_Sell", "Stock", "Broker"]
+TRADES_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS trades (
+        Date TEXT,
+        Fund TEXT,
+        Classification TEXT,
+        Stock TEXT,
+        Buy_Sell TEXT,
+        Broker TEXT,
+        Volume REAL,
+        Price REAL,
+        Value REAL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_trades_date_fund ON trades (Date, Fund)",
+    "CREATE INDEX IF NOT EXISTS idx_trades_stock_date ON trades (Stock, Date)",
+]
+
+# The Rust-based calamine reader is several times faster than openpyxl when python-calamine is installed
+EXCEL_ENGINE = "calamine" if importlib.util.find_spec("python_calamine") else "openpyxl"
+
+
+@traced(rows=len)
+def load_trades(data, engine=EXCEL_ENGINE):
+    # `data` is the workbook's bytes. Returns every valid fund sheet stacked, with a Fund column, datetime64 Date
+    # and Value = Volume * Price; sheets outside FUND_SHEET_MAP are never parsed.
+    frames = []
+    with pd.ExcelFile(io.BytesIO(data), engine=engine) as workbook:
+        for fund, sheets in FUND_SHEET_MAP.items():
+            for sheet in sheets:
+                if sheet not in workbook.sheet_names:
+                    continue
+                df = workbook.parse(sheet, dtype=TRADE_DTYPES)
+                if not REQUIRED_COLUMNS.issubset(df.columns):
+                    continue
+                df["Date"] = pd.to_datetime(df["Date"]).dt.normalize()
+                df["Value"] = df["Volume"] * df["Price"]
+                df["Fund"] = fund
+                frames.append(df)
+    if not frames:
+        return pd.DataFrame()
+    return _categorize(pd.concat(frames, ignore_index=True))
+
+
+def _categorize(df):
+    for col in CATEGORICAL_COLUMNS:
+        if col in df:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def filter_trades(trades, funds, date_from, date_to):
+    if trades.empty:
+        return trades
+    mask = trades["Fund"].isin(funds) & trades["Date"].between(pd.Timestamp(date_from), pd.Timestamp(date_to))
+    return trades[mask].reset_index(drop=True)
+
+
+def summarize_frame(trades, by):
+    # In-memory twin of summarize_trades for a workbook that has not been stored
+    summary = trades.groupby(list(by), observed=True).agg(
+        Total_Volume=("Volume", "sum"), Total_Value=("Value", "sum")
+    ).reset_index()
+    summary["Weighted_Avg_Price"] = (summary["Total_Value"] / summary["Total_Volume"]).round(2)
+    return summary
+
+
+@traced(rows=len)
+def trade_cube(trades):
+    # One pass over the blotter: Total_Volume/Total_Value per CUBE_KEYS cell, for rollup_cube to re-aggregate
+    return summarize_frame(trades, CUBE_KEYS)
+
+
+def rollup_cube(cube, by):
+    # Any coarser summary from the cube: sums re-aggregate exactly and the weighted price is recomputed
+    # from them. Keys come back as plain labels so the small result can be pivoted and extended freely.
+    summary = cube.groupby(list(by), observed=True)[["Total_Volume", "Total_Value"]].sum().reset_index()
+    summary["Weighted_Avg_Price"] = (summary["Total_Value"] / summary["Total_Volume"]).round(2)
+    for col in by:
+        if isinstance(summary[col].dtype, pd.CategoricalDtype):
+            summary[col] = summary[col].astype(summary[col].cat.categories.dtype)
+    return summary
+
+
+def save_trades(trades, db_path):
+    # A stored blotter is authoritative for every (Date, Fund) it covers: those rows are replaced, so storing
+    # the same workbook twice, or one overlapping an earlier upload, never double-counts. Returns rows stored.
+    if trades.empty:
+        return 0
+    trades = trades.assign(Date=trades["Date"].dt.strftime("%Y-%m-%d"))
+    placeholders = ", ".join("?" * len(TRADE_COLUMNS))
+    with get_pool(db_path).writer() as conn, conn:
+        conn.execute("BEGIN")
+        ensure_schema(conn)
+        for statement in TRADES_SCHEMA:
+            conn.execute(statement)
+        conn.executemany(
+            "DELETE FROM trades WHERE Date = ? AND Fund = ?",
+            trades[["Date", "Fund"]].drop_duplicates().itertuples(index=False, name=None),
+        )
+        conn.executemany(
+            f"INSERT INTO trades ({', '.join(TRADE_COLUMNS)}) VALUES ({placeholders})",
+            to_sql_rows(trades, TRADE_COLUMNS),
+        )
+    bump_data_version()
+    return len(trades)
+
+
+def _has_trades(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'trades'").fetchone() is not None
+
+
+def _trade_where(funds=None, date_range=None, alias=""):
+    clauses, params = [], []
+    if funds is not None:
+        funds = list(funds)
+        clauses.append(f"{alias}Fund IN ({', '.join('?' * len(funds))})")
+        params.extend(funds)
+    if date_range is not None:
+        start, end = date_range
+        clauses.append(f"{alias}Date BETWEEN ? AND ?")
+        params.extend([str(start), str(end)])
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def _with_dates(df):
+    if "Date" in df:
+        df["Date"] = pd.to_datetime(df["Date"])
+    return df
+
+
+def trade_date_bounds(db_path):
+    with get_pool(db_path).reader() as conn:
+        if not _has_trades(conn):
+            return None, None
+        first, last = conn.execute("SELECT MIN(Date), MAX(Date) FROM trades").fetchone()
+    if first is None:
+        return None, None
+    return pd.Timestamp(first).date(), pd.Timestamp(last).date()
+
+
+def read_trades(db_path, funds=None, date_range=None):
+    # Stored rows in the same shape load_trades gives for an upload
+    where, params = _trade_where(funds, date_range)
+    with get_pool(db_path).reader() as conn:
+        if not _has_trades(conn):
+            return pd.DataFrame(columns=TRADE_COLUMNS)
+        df = pd.read_sql(f"SELECT {', '.join(TRADE_COLUMNS)} FROM trades{where} ORDER BY Date, Fund", conn, params=params)
+    return _with_dates(df)
+
+
+def iter_trades(db_path, funds=None, date_range=None, chunk_rows=READ_CHUNK_ROWS):
+    # read_trades as frames of at most `chunk_rows` rows, for exports that must not hold the whole blotter
+    where, params = _trade_where(funds, date_range)
+    dtype = {"Volume": "float64", "Price": "float64", "Value": "float64"}
+    with get_pool(db_path).reader() as conn:
+        if not _has_trades(conn):
+            yield pd.DataFrame(columns=TRADE_COLUMNS)
+            return
+        sql = f"SELECT {', '.join(TRADE_COLUMNS)} FROM trades{where} ORDER BY Date, Fund"
+        for chunk in pd.read_sql(sql, conn, params=params, chunksize=chunk_rows, dtype=dtype):
+            yield _with_dates(chunk)
+
+
+def summarize_trades(db_path, by, funds=None, date_range=None):
+    # Total_Volume, Total_Value and Weighted_Avg_Price per `by` group in one GROUP BY over the stored trades
+    unknown = [col for col in by if col not in TRADE_GROUPS]
+    if unknown:
+        raise ValueError(f"Cannot group trades by {unknown}")
+    keys = ", ".join(by)
+    where, params = _trade_where(funds, date_range)
+    with get_pool(db_path).reader() as conn:
+        if not _has_trades(conn):
+            return pd.DataFrame(columns=list(by) + ["Total_Volume", "Total_Value", "Weighted_Avg_Price"])
+        df = pd.read_sql(
+            f"""
+            SELECT {keys}, SUM(Volume) AS Total_Volume, SUM(Value) AS Total_Value,
+                   ROUND(SUM(Value) / NULLIF(SUM(Volume), 0), 2) AS Weighted_Avg_Price
+            FROM trades{where}
+            GROUP BY {keys}
+            ORDER BY {keys}
+            """,
+            conn,
+            params=params,
+        )
+    return _with_dates(df)
+
+
+def stored_trade_cube(db_path, funds=None, date_range=None):
+    # trade_cube for stored trades, as a single GROUP BY
+    return _categorize(summarize_trades(db_path, CUBE_KEYS, funds, date_range))
+
+
+def trade_vwap_vs_market(db_path, funds=None, date_range=None):
+    # The funds' VWAP per (Date, Stock, Buy_Sell) against that day's market VWAP from stock_data.
+    # Slippage_bps is signed so positive means worse for the fund: paid above market, or sold below it.
+    where, params = _trade_where(funds, date_range, alias="t.")
+    with get_pool(db_path).reader() as conn:
+        if not _has_trades(conn):
+            return pd.DataFrame()
+        df = pd.read_sql(
+            f"""
+            SELECT t.Date, t.Stock, t.Buy_Sell, SUM(t.Volume) AS Total_Volume,
+                   SUM(t.Value) / NULLIF(SUM(t.Volume), 0) AS Trade_VWAP, d.VWAP AS Market_VWAP
+            FROM trades t
+            LEFT JOIN stock_data d ON d.Stock = t.Stock AND d.Date = t.Date
+            {where}
+            GROUP BY t.Date, t.Stock, t.Buy_Sell
+            ORDER BY t.Date, t.Stock, t.Buy_Sell
+            """,
+            conn,
+            params=params,
+        )
+    df["Market_VWAP"] = pd.to_numeric(df["Market_VWAP"])  # all-NULL when no stock_data matches
+    side = df["Buy_Sell"].map({"B": 1.0, "S": -1.0})
+    df["Slippage_bps"] = ((df["Trade_VWAP"] / df["Market_VWAP"] - 1) * 1e4 * side).round(1)
+    return _with_dates(df)
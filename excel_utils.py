@@ -0,0 +1,85 @@
+# excel_utils.py
+
+import numpy as np
+import pandas as pd
+
+from perf_utils import traced
+
+BTH_COLUMNS = ["Date", "Open", "High", "Low", "Close", "Volume", "Value"]
+NA_TOKENS = ["#N/A", "N/A", "#N/A N/A"]
+
+# BTH template layout: ticker header on row 4, data from row 6, 7-column blocks every 8 columns
+TICKER_ROW = 4
+DATA_START_ROW = 6
+BLOCK_STRIDE = 8
+
+
+def _block_length(block):
+    # A block ends at its first fully empty row, like the template's per-ticker history
+    empty = pd.isna(block).all(axis=1)
+    return int(empty.argmax()) if empty.any() else len(block)
+
+
+def _null_na_tokens(data):
+    # Only string cells can hold Bloomberg NA markers, so normalize just those
+    is_str = np.frompyfunc(lambda cell: isinstance(cell, str), 1, 1)(data).astype(bool)
+    if is_str.any():
+        is_na = np.array([cell.strip().upper() in NA_TOKENS for cell in data[is_str]], dtype=bool)
+        data[tuple(idx[is_na] for idx in np.nonzero(is_str))] = None
+
+
+def _find_tickers(header):
+    tickers = []
+    for col_index in range(0, len(header), BLOCK_STRIDE):
+        if header[col_index] is None:
+            break
+        tickers.append((col_index, header[col_index].split()[0]))
+    return tickers
+
+
+def _read_grid(rows, width, expected_rows):
+    values = np.full((max(expected_rows, 1), width), None, dtype=object)
+    n_rows = 0
+    for row in rows:
+        if n_rows == len(values):
+            values = np.concatenate([values, np.full_like(values, None)])
+        row = row[:width]
+        values[n_rows, :len(row)] = row
+        n_rows += 1
+    return values[:n_rows]
+
+
+@traced("parse_excel", rows=len)
+def parse_excel(file):
+    import openpyxl  # deferred: only the upload path needs it
+
+    wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        rows = ws.iter_rows(min_row=TICKER_ROW, values_only=True)
+        tickers = _find_tickers(next(rows, ()))
+        if not tickers:
+            return pd.DataFrame()
+        next(rows, None)  # Column titles row
+        width = tickers[-1][0] + len(BTH_COLUMNS)
+        values = _read_grid(rows, width, (ws.max_row or 0) - DATA_START_ROW + 1)
+    finally:
+        wb.close()
+
+    blocks, stocks, lengths = [], [], []
+    for col_index, stock in tickers:
+        block = values[:, col_index:col_index + len(BTH_COLUMNS)]
+        n_rows = _block_length(block)
+        if n_rows:
+            blocks.append(block[:n_rows])
+            stocks.append(stock)
+            lengths.append(n_rows)
+    if not blocks:
+        return pd.DataFrame()
+
+    data = np.concatenate(blocks)
+    _null_na_tokens(data)
+    df = pd.DataFrame(data, columns=BTH_COLUMNS).infer_objects()
+    df.insert(0, "Stock", np.repeat(stocks, lengths))
+    df["Date"] = pd.to_datetime(df["Date"]).dt.date
+    return df
@@ -0,0 +1,144 @@
+# export_utils.py
+#
+# Streaming exports. write_export takes any iterable of DataFrame chunks, e.g.
+# db_utils.iter_database or equity_utils.iter_trades paging through SQLite,
+# and writes CSV, Parquet or XLSX one chunk at a time, so peak memory is one
+# chunk plus the writer's buffers whatever the size of the result. Parquet
+# needs pyarrow and is only offered when it is installed; XLSX uses openpyxl's
+# write-only mode, which spools rows to a temporary file instead of keeping
+# cell objects.
+
+import importlib.util
+import io
+import os
+import tempfile
+from contextlib import contextmanager
+
+from db_utils import READ_CHUNK_ROWS
+from perf_utils import trace
+
+EXPORT_FORMATS = ("csv", "parquet", "xlsx") if importlib.util.find_spec("pyarrow") else ("csv", "xlsx")
+MIME_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+XLSX_SHEET = "Data"
+XLSX_MAX_ROWS = 1_048_576  # per sheet, header included; longer exports continue on "Data 2", "Data 3", ...
+
+
+def export_format(path, fmt=None):
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt!r} (expected one of {', '.join(EXPORT_FORMATS)})")
+    return fmt
+
+
+def frame_chunks(df, chunk_rows=READ_CHUNK_ROWS):
+    # An in-memory frame as the chunks write_export takes; the slices are views, and an empty frame still
+    # yields once so the export gets its header
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+@contextmanager
+def _text(target):
+    if isinstance(target, (str, os.PathLike)):
+        with open(target, "w", encoding="utf-8", newline="") as fh:
+            yield fh
+        return
+    fh = io.TextIOWrapper(target, encoding="utf-8", newline="")
+    try:
+        yield fh
+    finally:
+        fh.flush()
+        fh.detach()  # leave the caller's binary file open
+
+
+def _write_csv(chunks, target):
+    rows = 0
+    with _text(target) as fh:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(fh, header=i == 0, index=False)
+            rows += len(chunk)
+    return rows
+
+
+def _write_parquet(chunks, target):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer, rows = None, 0
+    try:
+        for chunk in chunks:
+            # Later chunks are cast to the first one's schema, so every row group agrees
+            table = pa.Table.from_pandas(chunk, schema=writer.schema if writer else None, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(target, table.schema)
+            writer.write_table(table)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        pq.write_table(pa.table({}), target)
+    return rows
+
+
+def _excel_rows(chunk):
+    # openpyxl cells take plain values: None for missing, dates without a time of day
+    values = chunk.astype(object).where(chunk.notna(), None)
+    for col, dtype in chunk.dtypes.items():
+        if dtype.kind == "M":
+            values[col] = chunk[col].dt.date.astype(object).where(chunk[col].notna(), None)
+    return values.itertuples(index=False, name=None)
+
+
+def _write_xlsx(chunks, target):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet, header, sheet_rows, rows = None, None, 0, 0
+
+    def new_sheet():
+        name = XLSX_SHEET if not workbook.worksheets else f"{XLSX_SHEET} {len(workbook.worksheets) + 1}"
+        created = workbook.create_sheet(name)
+        created.append(header)
+        return created
+
+    for chunk in chunks:
+        header = [str(col) for col in chunk.columns]
+        if sheet is None:
+            sheet, sheet_rows = new_sheet(), 1
+        for row in _excel_rows(chunk):
+            if sheet_rows == XLSX_MAX_ROWS:
+                sheet, sheet_rows = new_sheet(), 1
+            sheet.append(row)
+            sheet_rows += 1
+        rows += len(chunk)
+    if sheet is None:
+        workbook.create_sheet(XLSX_SHEET)
+    workbook.save(target)
+    return rows
+
+
+_WRITERS = {"csv": _write_csv, "parquet": _write_parquet, "xlsx": _write_xlsx}
+
+
+def write_export(chunks, target, fmt):
+    # `target` is a path or a writable binary file; returns the rows written
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt!r} (expected one of {', '.join(EXPORT_FORMATS)})")
+    with trace(f"export_{fmt}") as span:
+        rows = _WRITERS[fmt](iter(chunks), target)
+        span.rows = rows
+    return rows
+
+
+def export_bytes(chunks, fmt):
+    # For download buttons, which need the file's bytes: the export is streamed to a temporary file first,
+    # so only the finished (compressed, for Parquet and XLSX) output is ever held in memory
+    with tempfile.TemporaryFile() as fh:
+        write_export(chunks, fh, fmt)
+        fh.seek(0)
+        return fh.read()
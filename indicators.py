@@ -0,0 +1,74 @@
+# indicators.py
+#
+# Registry of per-stock technical indicators stored in the stock_indicators
+# table. Each entry is a vectorized function over daily rows of many stocks
+# sorted by (Stock, Date), plus how many earlier rows of the same stock it
+# needs; save_to_db re-evaluates only the rows a write touched, reading just
+# that lookback tail before them (see db_utils.refresh_indicators).
+
+import numpy as np
+import pandas as pd
+
+# name -> (func(df, by) -> Series aligned to df, lookback rows); by is df.groupby("Stock")
+INDICATORS = {}
+
+
+def register_indicator(name, lookback):
+    def decorator(func):
+        INDICATORS[name] = (func, lookback)
+        return func
+
+    return decorator
+
+
+def _rolling_mean(by, col, window):
+    return by[col].rolling(window, min_periods=window).mean().reset_index(level=0, drop=True)
+
+
+@register_indicator("Return", lookback=1)
+def daily_return(df, by):
+    return by["Close"].pct_change()
+
+
+@register_indicator("SMA_20", lookback=19)
+def sma_20(df, by):
+    return _rolling_mean(by, "Close", 20)
+
+
+@register_indicator("SMA_50", lookback=49)
+def sma_50(df, by):
+    return _rolling_mean(by, "Close", 50)
+
+
+@register_indicator("ATR_14", lookback=14)
+def atr_14(df, by):
+    # Simple 14-day mean of the true range, so the tail it needs stays finite (Wilder's smoothing never forgets)
+    prev_close = by["Close"].shift()
+    true_range = pd.concat(
+        [df["High"] - df["Low"], (df["High"] - prev_close).abs(), (df["Low"] - prev_close).abs()], axis=1
+    ).max(axis=1, skipna=False)
+    return _rolling_mean(df.assign(TR=true_range).groupby("Stock", observed=True, sort=False), "TR", 14)
+
+
+@register_indicator("VWAP_Dev", lookback=0)
+def vwap_deviation(df, by):
+    # Close relative to the day's VWAP, as a fraction like Return
+    return df["Close"] / df["VWAP"] - 1
+
+
+def indicator_lookback():
+    return max((lookback for _, lookback in INDICATORS.values()), default=0)
+
+
+def compute_indicators(df):
+    # `df` holds daily rows sorted by (Stock, Date); returns Stock, Date and one float64 column per indicator
+    df = df.reset_index(drop=True)
+    for col in ("Open", "High", "Low", "Close", "VWAP"):
+        if col in df:
+            df[col] = df[col].astype(np.float64)
+    by = df.groupby("Stock", observed=True, sort=False)
+    out = df[["Stock", "Date"]].copy()
+    for name, (func, _) in INDICATORS.items():
+        out[name] = func(df, by).astype(np.float64)
+    # pct_change and divisions by a zero VWAP give inf; store those as missing
+    return out.replace([np.inf, -np.inf], np.nan)
@@ -0,0 +1,53 @@
+# ingest.py
+#
+# Batch ingest of BTH workbooks: parse in a process pool, write through a single
+# save_to_db caller, in the order the files were given, so SQLite only ever sees
+# one writer.
+#
+# From the command line: python -m stockdb ingest FILE.xlsx [FILE.xlsx ...]
+
+import io
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from db_utils import save_to_db
+from excel_utils import parse_excel
+
+
+def _parse_job(source):
+    start = time.perf_counter()
+    df = parse_excel(io.BytesIO(source) if isinstance(source, bytes) else source)
+    return df, time.perf_counter() - start
+
+
+def ingest_files(files, db_path, max_workers=None, on_conflict="ignore", save=save_to_db):
+    # `files` is an iterable of (name, path or raw bytes) pairs; `save` takes (df, db_path, on_conflict=...) and
+    # returns the new rows, e.g. parquet_store.save_to_parquet with a dataset root as `db_path`
+    report = []
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+        # Every file parses in parallel, but saves run in input order so overlapping workbooks resolve the same
+        # way on every run: with "update" the last file given wins, with "ignore" the first
+        futures = [(name, pool.submit(_parse_job, source)) for name, source in files]
+        for name, future in futures:
+            entry = {"File": name, "Parsed Rows": 0, "New Rows": 0, "Stocks": 0,
+                     "Parse (s)": None, "Save (s)": None, "Error": None}
+            try:
+                df, parse_seconds = future.result()
+                start = time.perf_counter()
+                new_rows = save(df, db_path, on_conflict=on_conflict) if not df.empty else pd.DataFrame()
+                entry.update({
+                    "Parsed Rows": len(df),
+                    "New Rows": len(new_rows),
+                    "Stocks": df["Stock"].nunique() if not df.empty else 0,
+                    "Parse (s)": round(parse_seconds, 3),
+                    "Save (s)": round(time.perf_counter() - start, 3),
+                })
+            except Exception as exc:
+                entry["Error"] = str(exc)
+            report.append(entry)
+    return pd.DataFrame(report)
+
@@ -0,0 +1,231 @@
+# parquet_store.py
+#
+# Optional columnar copy of stock_data: a Parquet dataset partitioned by year
+# (or by stock) with dictionary-encoded tickers. Filters on Stock/Date and the
+# column list are pushed down into the Arrow scan, so a Close-for-N-stocks
+# slice only reads the row groups and columns it needs. Requires pyarrow.
+#
+# Stock is dictionary-encoded in the Parquet pages rather than as an Arrow
+# dictionary column: the scanner skips row-group statistics for dictionary
+# types, which would turn every Stock filter into a full scan.
+#
+#   python -m stockdb parquet convert [--root ohlc_parquet] [--partition year|stock]
+#   python -m stockdb --parquet ohlc_parquet ingest FILE.xlsx ...   (save_to_parquet instead of save_to_db)
+#   python -m stockdb --parquet ohlc_parquet query --stocks AC,ALI --columns Close
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from db_utils import STOCK_COLUMNS, INVALID_DATE, READ_CHUNK_ROWS, prepare_stock_data, compact_stock_frame, get_pool
+
+PARQUET_DIR = "ohlc_parquet"
+PARTITIONS = ("year", "stock")
+CONVERT_CHUNK_ROWS = 250_000
+# Rows are sorted by Stock inside each partition, so small row groups let Stock min/max stats skip most of a year
+ROW_GROUP_ROWS = 16_384
+
+STOCK_DATA_ARROW_SCHEMA = pa.schema([
+    ("Stock", pa.string()),
+    ("Date", pa.date32()),
+    ("Open", pa.float64()),
+    ("High", pa.float64()),
+    ("Low", pa.float64()),
+    ("Close", pa.float64()),
+    ("Volume", pa.int64()),
+    ("Value", pa.float64()),
+    ("VWAP", pa.float64()),
+])
+
+
+def _partitioning(partition):
+    if partition == "year":
+        return ds.partitioning(pa.schema([("Year", pa.int16())]), flavor="hive")
+    if partition == "stock":
+        return ds.partitioning(pa.schema([("Stock", pa.string())]), flavor="hive")
+    raise ValueError(f"Unknown partition scheme: {partition}")
+
+
+def _detect_partition(root):
+    for name in os.listdir(root):
+        if name.startswith("Year="):
+            return "year"
+        if name.startswith("Stock="):
+            return "stock"
+    return None
+
+
+def _to_table(df, partition):
+    dates = pd.to_datetime(df["Date"])
+    arrays = [
+        pa.array(df[field.name] if field.name != "Date" else dates.dt.date, type=field.type, from_pandas=True)
+        for field in STOCK_DATA_ARROW_SCHEMA
+    ]
+    table = pa.Table.from_arrays(arrays, schema=STOCK_DATA_ARROW_SCHEMA)
+    if partition == "year":
+        table = table.append_column("Year", pa.array(dates.dt.year, type=pa.int16()))
+    return table
+
+
+def _write(data, root, partition, schema=None):
+    # Replaces every partition present in `data` and leaves the others untouched
+    ds.write_dataset(
+        data,
+        root,
+        schema=schema,
+        format="parquet",
+        file_options=ds.ParquetFileFormat().make_write_options(use_dictionary=["Stock"]),
+        partitioning=_partitioning(partition),
+        existing_data_behavior="delete_matching",
+        basename_template="part-{i}.parquet",
+        min_rows_per_group=ROW_GROUP_ROWS,
+        max_rows_per_group=ROW_GROUP_ROWS,
+    )
+
+
+def _filter(stocks=None, date_range=None, partition="year"):
+    expr = ds.field("Date") != pd.Timestamp(INVALID_DATE).date()
+    if stocks is not None:
+        expr &= ds.field("Stock").isin(list(stocks))
+    if date_range is not None:
+        start, end = (pd.Timestamp(str(d)).date() for d in date_range)
+        expr &= (ds.field("Date") >= start) & (ds.field("Date") <= end)
+        if partition == "year":
+            # Partition keys are not derived from Date, so prune years explicitly
+            expr &= (ds.field("Year") >= start.year) & (ds.field("Year") <= end.year)
+    return expr
+
+
+def open_dataset(root=PARQUET_DIR):
+    partition = _detect_partition(root) if os.path.isdir(root) else None
+    if partition is None:
+        return None, None
+    return ds.dataset(root, format="parquet", partitioning=_partitioning(partition)), partition
+
+
+def _read_table(root, stocks=None, date_range=None, columns=None):
+    dataset, partition = open_dataset(root)
+    if dataset is None:
+        return None
+    columns = STOCK_COLUMNS if columns is None else [c for c in STOCK_COLUMNS if c in columns]
+    return dataset.to_table(columns=["Stock", "Date"] + columns, filter=_filter(stocks, date_range, partition))
+
+
+def read_parquet(root=PARQUET_DIR, stocks=None, date_range=None, columns=None, compact=True):
+    # Same contract as db_utils.read_database: Stock, Date and the requested columns in compact dtypes
+    table = _read_table(root, stocks, date_range, columns)
+    if table is None:
+        return pd.DataFrame()
+    df = table.to_pandas(date_as_object=False)
+    return compact_stock_frame(df) if compact else df
+
+
+def iter_parquet(root=PARQUET_DIR, stocks=None, date_range=None, columns=None, chunk_rows=READ_CHUNK_ROWS):
+    # read_parquet's full-precision rows as frames of at most `chunk_rows` rows, scanned batch by batch
+    dataset, partition = open_dataset(root)
+    if dataset is None:
+        return
+    columns = STOCK_COLUMNS if columns is None else [c for c in STOCK_COLUMNS if c in columns]
+    batches = dataset.to_batches(
+        columns=["Stock", "Date"] + columns, filter=_filter(stocks, date_range, partition), batch_size=chunk_rows
+    )
+    for batch in batches:
+        if batch.num_rows:
+            yield batch.to_pandas(date_as_object=False)
+
+
+def save_to_parquet(df, root=PARQUET_DIR, on_conflict="ignore", partition="year"):
+    # Rewrites only the partitions the batch touches; returns the rows whose (Stock, Date) was new
+    if on_conflict not in ("ignore", "update"):
+        raise ValueError(f"Unknown on_conflict mode: {on_conflict}")
+
+    df = prepare_stock_data(df)
+    if df.empty:
+        return pd.DataFrame()
+    df = df[["Stock", "Date"] + STOCK_COLUMNS]
+
+    existing_partition = _detect_partition(root) if os.path.isdir(root) else None
+    partition = existing_partition or partition
+    # Merge against the stored full-precision rows, not the compact frame read_parquet returns
+    if partition == "year":
+        years = sorted({d.year for d in df["Date"]})
+        existing = _read_table(root, date_range=(f"{years[0]}-01-01", f"{years[-1]}-12-31"))
+    else:
+        existing = _read_table(root, stocks=df["Stock"].unique().tolist())
+    existing = existing.to_pandas() if existing is not None else pd.DataFrame()
+    if partition == "year" and not existing.empty:
+        existing = existing[pd.to_datetime(existing["Date"]).dt.year.isin(years)]
+
+    keys = pd.MultiIndex.from_frame(df[["Stock", "Date"]])
+    if existing.empty:  # a new dataset, or the first rows of a new year partition
+        is_new = np.ones(len(df), dtype=bool)
+    else:
+        is_new = ~keys.isin(pd.MultiIndex.from_frame(existing[["Stock", "Date"]]))
+    new_data = df[is_new].reset_index(drop=True)
+
+    # Existing rows win on "ignore", the batch wins on "update"
+    frames = [existing, df] if on_conflict == "ignore" else [df, existing]
+    merged = pd.concat([f for f in frames if not f.empty], ignore_index=True)
+    merged = merged.drop_duplicates(subset=["Stock", "Date"]).sort_values(["Stock", "Date"])
+    _write(_to_table(merged, partition), root, partition)
+    return new_data
+
+
+def _replace_dataset(built, root):
+    # Swaps the freshly written `built` directory in for `root`, moving any previous dataset out of the way first
+    if not os.path.exists(root):
+        os.replace(built, root)
+        return
+    previous = tempfile.mkdtemp(prefix=f".{os.path.basename(root)}.old.", dir=os.path.dirname(root))
+    os.replace(root, os.path.join(previous, "dataset"))
+    os.replace(built, root)
+    shutil.rmtree(previous)
+
+
+def convert_sqlite_to_parquet(db_path, root=PARQUET_DIR, partition="year", chunk_rows=CONVERT_CHUNK_ROWS):
+    # The dataset is written beside `root` and swapped in once complete, so a failed conversion keeps the
+    # previous one. An existing `root` is only replaced when it is empty or one of our datasets.
+    if partition not in PARTITIONS:
+        raise ValueError(f"Unknown partition scheme: {partition}")
+    root = os.path.abspath(root)
+    if os.path.exists(root) and not (os.path.isdir(root) and (not os.listdir(root) or _detect_partition(root))):
+        raise ValueError(f"{root} exists and is not a Parquet dataset; refusing to replace it")
+
+    built = tempfile.mkdtemp(prefix=f".{os.path.basename(root)}.", dir=os.path.dirname(root))
+    try:
+        rows = _convert(db_path, built, partition, chunk_rows)
+        _replace_dataset(built, root)
+    finally:
+        if os.path.isdir(built):
+            shutil.rmtree(built)
+    return rows
+
+
+def _convert(db_path, root, partition, chunk_rows):
+    select = ", ".join(["Stock", "Date"] + STOCK_COLUMNS)
+    order = "substr(Date, 1, 4), Stock, Date" if partition == "year" else "Stock, Date"
+    # Arrow pulls the batches from its own writer thread; pooled connections allow that
+    with get_pool(db_path).reader() as conn:
+        chunks = pd.read_sql(
+            f"SELECT {select} FROM stock_data WHERE Date != ? ORDER BY {order}",
+            conn, params=[INVALID_DATE], chunksize=chunk_rows,
+        )
+        first = next(chunks, None)
+        if first is None or first.empty:
+            return 0
+        first_table = _to_table(first, partition)
+        rows = [len(first)]
+
+        def batches():
+            yield from first_table.to_batches()
+            for chunk in chunks:
+                rows.append(len(chunk))
+                yield from _to_table(chunk, partition).to_batches()
+
+        _write(batches(), root, partition, schema=first_table.schema)
+    return sum(rows)
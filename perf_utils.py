@@ -0,0 +1,199 @@
+# perf_utils.py
+#
+# Lightweight stage tracing. `with trace("stage") as span` (set span.rows once
+# the count is known) or `@traced("stage", rows=len)` records wall time, rows
+# processed and the process's peak RSS for a pipeline stage. Tracing is off
+# unless STOCKDB_PERF=1 or enable() is called; while off, a stage costs one flag
+# check. STOCKDB_PERF=memory also measures each stage's own peak allocation with
+# tracemalloc, which slows allocation-heavy stages such as parsing several-fold.
+# Finished stages are appended as JSON lines to the perf log, so runs from many
+# sessions can be aggregated with summarize_log, and the most recent ones are
+# kept in memory for the apps' perf panel.
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows: no peak RSS
+    resource = None
+
+PERF_LOG = os.environ.get("STOCKDB_PERF_LOG", "perf_log.jsonl")
+RECENT_MAX = 500  # stages kept in memory for the perf panel
+
+_enabled = os.environ.get("STOCKDB_PERF", "") not in ("", "0")
+_memory = os.environ.get("STOCKDB_PERF") == "memory"
+_log_path = PERF_LOG
+_recent = deque(maxlen=RECENT_MAX)
+_lock = threading.Lock()
+_local = threading.local()
+
+
+class Span:
+    __slots__ = ("stage", "rows", "start", "start_memory", "peak")
+
+    def __init__(self, stage, rows=None):
+        self.stage = stage
+        self.rows = rows
+
+
+# Handed out while tracing is off; writes to its span are discarded
+_DISABLED = nullcontext(Span(None))
+
+
+def enable(path=None, memory=False):
+    global _enabled, _memory, _log_path
+    _log_path = path or _log_path
+    # Spawned worker processes (e.g. ingest's parse pool) read the flag from the environment
+    os.environ["STOCKDB_PERF"] = "memory" if memory else "1"
+    os.environ["STOCKDB_PERF_LOG"] = _log_path
+    _memory = memory
+    _enabled = True
+
+
+def disable():
+    global _enabled, _memory
+    _enabled = _memory = False
+    os.environ.pop("STOCKDB_PERF", None)
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def is_enabled():
+    return _enabled
+
+
+def log_path():
+    return _log_path
+
+
+def _max_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def trace(stage, rows=None):
+    return _trace(stage, rows) if _enabled else _DISABLED
+
+
+@contextmanager
+def _trace(stage, rows):
+    stack = _stack()
+    span = Span(stage, rows)
+    span.start_memory = span.peak = None
+    if _memory:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        # tracemalloc has a single peak counter: fold it into the enclosing stage before resetting it for this one
+        _, peak = tracemalloc.get_traced_memory()
+        if stack and stack[-1].peak is not None:
+            stack[-1].peak = max(stack[-1].peak, peak)
+        tracemalloc.reset_peak()
+        span.start_memory, _ = tracemalloc.get_traced_memory()
+        span.peak = span.start_memory
+    stack.append(span)
+    span.start = time.perf_counter()
+    try:
+        yield span
+    finally:
+        seconds = time.perf_counter() - span.start
+        stack.pop()
+        peak_mb = None
+        if span.peak is not None and tracemalloc.is_tracing():
+            span.peak = max(span.peak, tracemalloc.get_traced_memory()[1])
+            if stack and stack[-1].peak is not None:
+                stack[-1].peak = max(stack[-1].peak, span.peak)
+            peak_mb = round((span.peak - span.start_memory) / 2**20, 3)
+        _record({
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "stage": stage,
+            "seconds": round(seconds, 6),
+            "rows": None if span.rows is None else int(span.rows),
+            "peak_mb": peak_mb,
+            "max_rss_mb": _max_rss_mb(),
+            "parent": stack[-1].stage if stack else None,
+            "pid": os.getpid(),
+            "thread": threading.current_thread().name,
+        })
+
+
+def traced(stage=None, rows=None):
+    # Decorator form of trace; `rows` maps the return value to a row count, e.g. rows=len
+    def decorator(func):
+        name = stage or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with trace(name) as span:
+                result = func(*args, **kwargs)
+                if rows is not None:
+                    span.rows = rows(result)
+                return result
+
+        return wrapper
+
+    return decorator
+
+
+def _record(entry):
+    line = json.dumps(entry) + "\n"
+    with _lock:
+        _recent.append(entry)
+        try:
+            with open(_log_path, "a", encoding="utf-8") as fh:
+                fh.write(line)
+        except OSError:
+            pass  # a read-only working directory must not break the traced code
+
+
+def recent_stages():
+    with _lock:
+        return pd.DataFrame(list(_recent))
+
+
+def summarize_stages(records):
+    # Per-stage calls, total/mean/p95/max seconds, rows and worst peak memory; slowest stages first.
+    # Peak_MB is the stage's own allocation (memory mode only); Max_RSS_MB the process high-water mark after it.
+    if records.empty:
+        return pd.DataFrame()
+    summary = records.groupby("stage").agg(
+        Calls=("seconds", "size"),
+        Total_s=("seconds", "sum"),
+        Mean_s=("seconds", "mean"),
+        P95_s=("seconds", lambda s: s.quantile(0.95)),
+        Max_s=("seconds", "max"),
+        Rows=("rows", "sum"),
+        Peak_MB=("peak_mb", "max"),
+        Max_RSS_MB=("max_rss_mb", "max"),
+    )
+    summary["Rows"] = summary["Rows"].round().astype("Int64")
+    return summary.sort_values("Total_s", ascending=False).reset_index().rename(columns={"stage": "Stage"})
+
+
+def summarize_log(path=PERF_LOG):
+    # Aggregates every session that appended to the log
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    return summarize_stages(pd.read_json(path, lines=True))
@@ -0,0 +1,260 @@
+# stock_page.py
+#
+# The Stock DB Manager page shared by db_app.py and db_app_uat.py: workbook
+# upload, Drive upload/sync and admin deletes in update mode, the filtered
+# dataset and analyses in read mode.
+
+import os
+from functools import partial
+
+import pandas as pd
+import streamlit as st
+
+from db_utils import (
+    save_to_db, delete_records, get_data_version, pick_resolution, iter_database, DB_FILE_NAME, RESOLUTIONS,
+)
+from indicators import INDICATORS
+from excel_utils import parse_excel
+from ingest import ingest_files
+from cache_utils import (
+    cached_date_bounds, cached_stock_list, cached_pivot, cached_panel, cached_daily_returns,
+    cached_volatility, cached_correlation, cached_regression, cached_rolling_beta, cached_rolling_stat,
+    start_warm_up, DEFAULT_STOCK_COUNT, DEFAULT_COLUMNS,
+)
+from ui_utils import paged_dataframe, line_chart, export_button, DATE_INDEX
+
+TEMPLATE_PATH = "data/Integrated_BTH_Template.xlsx"
+
+# --- USER CREDENTIALS (Hardcoded for now, can be replaced with DB verification) ---
+AUTHORIZED_USERS = {
+    "admin": "08201977",
+    "geonel": "miguel",
+}
+
+
+def stock_db_page(db_path=DB_FILE_NAME):
+    # Title
+    st.title("📊 Stock OHLC Database Management")
+
+    # Template download
+    if os.path.exists(TEMPLATE_PATH):
+        with open(TEMPLATE_PATH, "rb") as f:
+            st.sidebar.download_button("📥 Download BTH Template Sample", f, "BTH_Template_Sample.xlsx")
+
+    # Fetch the DB from Google Drive (if missing) and prime the caches in the background;
+    # the page only waits while there is no local copy yet
+    warm_up = start_warm_up(db_path)
+    if not os.path.exists(db_path) and not warm_up.done():
+        @st.fragment(run_every=1)
+        def wait_for_db():
+            if warm_up.done():
+                st.rerun()
+            st.info("🔄 Downloading DB from Google Drive...")
+
+        wait_for_db()
+        st.stop()
+    if warm_up.done() and warm_up.exception() is not None:
+        st.sidebar.warning(f"⚠️ Background DB load failed: {warm_up.exception()}")
+
+    # Sidebar Mode
+    mode = st.sidebar.radio("Select Mode", ["Update / Create Stock Database", "Read an Existing Database"])
+    if mode == "Update / Create Stock Database":
+        _update_mode(db_path)
+    elif mode == "Read an Existing Database":
+        _read_mode(db_path)
+
+
+def _update_mode(db_path):
+    uploaded_files = st.sidebar.file_uploader("Upload Excel File(s)", type=["xlsx"], accept_multiple_files=True)
+    uploaded_file = uploaded_files[0] if len(uploaded_files) == 1 else None
+    if uploaded_file:
+        parsed_df = parse_excel(uploaded_file)
+        if not parsed_df.empty:
+            parsed_df["Value"] = pd.to_numeric(parsed_df["Value"], errors="coerce")
+            parsed_df["Volume"] = pd.to_numeric(parsed_df["Volume"], errors="coerce")
+            parsed_df["VWAP"] = (parsed_df["Value"] / parsed_df["Volume"]).round(4)
+
+            st.subheader("📋 Preview of Uploaded Data with VWAP")
+            st.dataframe(parsed_df.head(10))
+            overwrite = st.sidebar.checkbox("♻️ Overwrite existing records")
+            if st.sidebar.button("💾 Save to Database"):
+                new_rows = save_to_db(parsed_df, db_path, on_conflict="update" if overwrite else "ignore")
+                if not new_rows.empty:
+                    summary = new_rows.groupby("Stock")["Date"].agg(["min", "max"]).reset_index()
+                    summary.columns = ["Stock", "Date From", "Date To"]
+                    st.success(f"✅ {len(new_rows)} new records saved.")
+                    st.dataframe(summary)
+                else:
+                    st.info("ℹ️ No new records inserted.")
+    elif uploaded_files:
+        overwrite = st.sidebar.checkbox("♻️ Overwrite existing records")
+        if st.sidebar.button(f"💾 Save {len(uploaded_files)} Files to Database"):
+            with st.spinner(f"Parsing {len(uploaded_files)} workbooks..."):
+                report = ingest_files(
+                    [(f.name, f.getvalue()) for f in uploaded_files],
+                    db_path,
+                    on_conflict="update" if overwrite else "ignore",
+                )
+            st.success(f"✅ {int(report['New Rows'].sum())} new records saved from {len(report)} file(s).")
+            if report["Error"].notna().any():
+                st.error("❌ Some files could not be ingested.")
+            st.dataframe(report)
+
+    if st.sidebar.button("📤 Upload DB to Google Drive"):
+        from drive_utils import upload_db_to_drive, DRIVE_FOLDER_ID
+
+        with st.spinner("Uploading to Google Drive..."):
+            file_id = upload_db_to_drive(db_path, DRIVE_FOLDER_ID)
+            st.success(f"✅ Uploaded DB to Drive. File ID: {file_id}")
+
+    if st.sidebar.button("🔄 Sync Changes with Google Drive"):
+        from drive_utils import pull_changes, push_changes
+
+        with st.spinner("Syncing changes with Google Drive..."):
+            pulled = pull_changes(db_path)
+            pushed = push_changes(db_path)
+            st.success(
+                f"✅ Applied {pulled} changeset(s) from Drive; "
+                + (f"pushed {pushed}." if pushed else "no local changes to push.")
+            )
+
+    _delete_panel(db_path)
+
+
+def _delete_panel(db_path):
+    # --- AUTHENTICATION LOGIC ---
+    st.sidebar.markdown("---")
+    st.sidebar.subheader("🔐 Admin Login to Delete Records")
+
+    username = st.sidebar.text_input("Username")
+    password = st.sidebar.text_input("Password", type="password")
+
+    is_authenticated = username in AUTHORIZED_USERS and password == AUTHORIZED_USERS[username]
+
+    if is_authenticated:
+        st.sidebar.success(f"Welcome, {username}. You may proceed.")
+
+        st.sidebar.markdown("---")
+        st.sidebar.subheader("🗑️ Delete from Database")
+        delete_type = st.sidebar.selectbox("Delete by:", ["None", "Date", "Stock and Date"])
+        if delete_type == "Date":
+            date_to_delete = st.sidebar.date_input("Select Date to Delete")
+            if st.sidebar.button("Delete Records by Date"):
+                deleted = delete_records(db_path, date_to_delete)
+                st.sidebar.success(f"✅ {deleted} records deleted for {date_to_delete}")
+        elif delete_type == "Stock and Date":
+            stock_input = st.sidebar.text_input("Stock Symbol (e.g. AC)")
+            date_input = st.sidebar.date_input("Select Date")
+            if st.sidebar.button("Delete Record for Stock and Date"):
+                deleted = delete_records(db_path, date_input, stock=stock_input)
+                st.sidebar.success(f"✅ {deleted} record(s) deleted for {stock_input} on {date_input}")
+
+    else:
+        if username or password:
+            st.sidebar.error("❌ Invalid credentials.")
+        st.sidebar.info("Please log in to access delete functions.")
+
+
+def _read_mode(db_path):
+    data_version = get_data_version(db_path)
+    min_date, max_date = None, None
+    if not os.path.exists(db_path):
+        st.error("❌ Database not found.")
+    else:
+        min_date, max_date = cached_date_bounds(db_path, data_version)
+    if min_date is None:
+        return
+
+    st.sidebar.markdown("---")
+    st.sidebar.subheader("📆 Filter Options")
+    date_range = st.sidebar.date_input("Select Date Range", [min_date, max_date], min_value=min_date, max_value=max_date)
+    if len(date_range) != 2:
+        st.info("ℹ️ Select both a start and an end date.")
+        st.stop()
+
+    stocks = cached_stock_list(db_path, data_version)
+    stock_input_mode = st.sidebar.checkbox("🔘 Use Stock List Input")
+    if stock_input_mode:
+        raw_input = st.sidebar.text_input("Enter comma-separated stocks (e.g. AC, ALI)")
+        input_stocks = [s.strip().upper() for s in raw_input.split(",") if s.strip()]
+        selected_stocks = [s for s in stocks if s in input_stocks]
+    else:
+        selected_stocks = st.sidebar.multiselect("Select Stocks", stocks, default=stocks[:DEFAULT_STOCK_COUNT])
+
+    # Indicator columns are precomputed at ingest (stock_indicators), so selecting them costs a join, not a recompute
+    columns = ["Open", "High", "Low", "Close", "Volume", "Value", "VWAP"] + list(INDICATORS)
+    selected_columns = st.sidebar.multiselect("Select Columns", columns, default=list(DEFAULT_COLUMNS))
+    # Long ranges show weekly/monthly bars from the rollup tables instead of every trading day
+    resolution = st.sidebar.selectbox("Resolution", ("Auto",) + RESOLUTIONS, format_func=str.title)
+    if resolution == "Auto":
+        resolution = pick_resolution(*date_range)
+    if resolution != "daily" and any(c in INDICATORS for c in selected_columns):
+        st.sidebar.caption("Indicators are daily series, so daily bars are shown.")
+        resolution = "daily"
+
+    query = (db_path, data_version, tuple(selected_stocks), tuple(date_range), tuple(selected_columns))
+    pivot_df = cached_pivot(*query, resolution)
+
+    if pivot_df.empty:
+        st.warning("⚠️ No matching records.")
+        st.stop()
+
+    st.subheader("📑 Filtered Dataset")
+    if resolution != "daily":
+        st.caption(f"Showing {resolution} bars for this range; the analyses below use daily data.")
+    # Several selected columns show as one (column, stock) panel; the analyses use the first column
+    shown_df = cached_panel(*query, resolution) if len(selected_columns) > 1 else pivot_df
+    paged_dataframe(shown_df, "pivot", column_config=DATE_INDEX)
+    # Exports stream the underlying rows from SQLite in chunks, whatever the selection's size
+    export_button(
+        partial(iter_database, db_path, selected_stocks, date_range, selected_columns, resolution),
+        f"stock_data_{resolution}_{date_range[0]}_{date_range[1]}",
+        "pivot",
+    )
+
+    st.sidebar.markdown("---")
+    st.sidebar.subheader("📊 Analysis Options")
+    selected_analyses = st.sidebar.multiselect(
+        "Select Analyses",
+        ["Daily Return", "Volatility", "Correlation", "Rolling Volatility", "Rolling Correlation", "Regression"],
+    )
+    if "Rolling Volatility" in selected_analyses or "Rolling Correlation" in selected_analyses:
+        rolling_window = st.sidebar.selectbox("Rolling Window", [20, 60, 252, "Expanding"], index=1)
+        rolling_window = None if rolling_window == "Expanding" else rolling_window
+        window_label = "Expanding" if rolling_window is None else f"{rolling_window}-Day"
+    if selected_analyses:
+        st.subheader("📈 Analysis Results")
+
+    if "Daily Return" in selected_analyses:
+        daily_return = cached_daily_returns(*query)
+        st.markdown("**📈 Daily Return**")
+        paged_dataframe(daily_return, "daily_return", column_config=DATE_INDEX)
+
+    if "Volatility" in selected_analyses:
+        volatility = cached_volatility(*query)
+        st.markdown("**📉 Volatility (Std Dev)**")
+        st.dataframe(volatility.to_frame(name="Volatility"))
+
+    if "Correlation" in selected_analyses:
+        correlation = cached_correlation(*query)
+        st.markdown("**🔗 Correlation Matrix**")
+        paged_dataframe(correlation, "correlation")
+
+    if "Rolling Volatility" in selected_analyses:
+        st.markdown(f"**📉 {window_label} Rolling Volatility**")
+        line_chart(cached_rolling_stat(*query, "volatility", rolling_window))
+
+    if "Rolling Correlation" in selected_analyses:
+        reference = st.selectbox("Correlation Reference Stock", pivot_df.columns)
+        st.markdown(f"**🔗 {window_label} Rolling Correlation vs. {reference}**")
+        line_chart(cached_rolling_stat(*query, "correlation", rolling_window, reference))
+
+    if "Regression" in selected_analyses:
+        benchmark = st.selectbox("Benchmark Stock", pivot_df.columns)
+        reg_results = cached_regression(*query, benchmark)
+        st.markdown("**📐 Regression Stats vs. Benchmark**")
+        st.dataframe(reg_results)
+
+        beta_window = st.number_input("Rolling Beta Window (days)", min_value=5, max_value=252, value=60, step=5)
+        st.markdown(f"**📐 Rolling {beta_window}-Day Beta vs. {benchmark}**")
+        line_chart(cached_rolling_beta(*query, benchmark, beta_window))
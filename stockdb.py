@@ -0,0 +1,314 @@
+# stockdb.py
+#
+# Headless entry point over the same functions the Streamlit apps use.
+#
+#   python -m stockdb ingest FILE.xlsx [FILE.xlsx ...] [--workers 4] [--overwrite]
+#   python -m stockdb query --stocks AC,ALI --start 2024-01-01 --columns Close
+#   python -m stockdb query --stocks AC --resolution monthly   (weekly/monthly rollup bars)
+#   python -m stockdb query --stocks AC --columns Close,SMA_20,ATR_14   (stored indicators, see indicators.py)
+#   python -m stockdb export --stocks AC --output ac.parquet   (.csv/.parquet/.xlsx, streamed in chunks)
+#   python -m stockdb export --trades --start 2024-06-01 --output trades.xlsx   (stored Equity Monitor trades)
+#   python -m stockdb sync pull|push [--full] [--credentials service_account.json | --local-drive DIR]
+#   python -m stockdb parquet convert [--root ohlc_parquet] [--partition year|stock]
+#   python -m stockdb --parquet ohlc_parquet query ...   (read from the Parquet dataset instead)
+#   python -m stockdb --parquet ohlc_parquet ingest FILE.xlsx ...   (append workbooks to the Parquet dataset)
+#   python -m stockdb analytics regression --stocks AC,ALI,BDO [--benchmark AC]
+#   python -m stockdb analytics rolling-volatility --stocks AC,ALI --window 0   (0 = expanding)
+#   python -m stockdb --perf ingest FILE.xlsx   (append stage timings to perf_log.jsonl; --perf memory adds allocations)
+#   python -m stockdb perf [--log perf_log.jsonl]   (per-stage summary across every logged session)
+
+import argparse
+import os
+import sys
+import time
+
+from db_utils import DB_FILE_NAME, STOCK_COLUMNS, RESOLUTIONS, read_database, iter_database, save_to_db
+from export_utils import EXPORT_FORMATS, export_format, frame_chunks, write_export
+from indicators import INDICATORS
+from perf_utils import PERF_LOG, enable
+from analytics import (
+    build_pivot, daily_returns, volatility, correlation, regression_stats, rolling_beta,
+    rolling_volatility, rolling_correlation,
+)
+
+ANALYSES = (
+    "returns", "volatility", "correlation", "regression", "rolling-beta", "rolling-volatility", "rolling-correlation",
+)
+
+
+def _split(value):
+    return [item.strip().upper() for item in value.split(",") if item.strip()] if value else None
+
+
+def _date_range(args):
+    if args.start or args.end:
+        return (args.start or "0000-01-01", args.end or "9999-12-31")
+    return None
+
+
+def _check_source(args, columns, resolution):
+    if args.parquet:
+        if resolution != "daily":
+            raise SystemExit("Rollup resolutions are only stored in the SQLite database")
+        if columns and any(c in INDICATORS for c in columns):
+            raise SystemExit("Indicators are only stored in the SQLite database")
+    elif resolution != "daily" and columns and any(c in INDICATORS for c in columns):
+        raise SystemExit("Indicators are daily series; drop --resolution or the indicator columns")
+
+
+def _query(args, columns=None, compact=True):
+    resolution = getattr(args, "resolution", "daily")
+    _check_source(args, columns, resolution)
+    if args.parquet:
+        from parquet_store import read_parquet
+
+        return read_parquet(
+            args.parquet, stocks=_split(args.stocks), date_range=_date_range(args), columns=columns, compact=compact
+        )
+    return read_database(
+        args.db, stocks=_split(args.stocks), date_range=_date_range(args), columns=columns, compact=compact,
+        resolution=resolution,
+    )
+
+
+def _query_chunks(args, columns=None):
+    # _query's full-precision rows as a stream of frames, for exports of any size
+    _check_source(args, columns, args.resolution)
+    if args.parquet:
+        from parquet_store import iter_parquet
+
+        return iter_parquet(args.parquet, stocks=_split(args.stocks), date_range=_date_range(args), columns=columns)
+    return iter_database(
+        args.db, stocks=_split(args.stocks), date_range=_date_range(args), columns=columns, resolution=args.resolution
+    )
+
+
+def _columns(args):
+    return [c for c in STOCK_COLUMNS + list(INDICATORS) if c.upper() in _split(args.columns)] if args.columns else None
+
+
+def _export_format(path, fmt=None):
+    try:
+        return export_format(path, fmt)
+    except ValueError as exc:
+        raise SystemExit(str(exc)) from exc
+
+
+def _write(df, path, fmt, index=False):
+    write_export(frame_chunks(df.reset_index() if index else df), path, fmt)
+
+
+def cmd_ingest(args):
+    from ingest import ingest_files
+
+    save = save_to_db
+    if args.parquet:
+        from parquet_store import save_to_parquet as save
+
+    start = time.perf_counter()
+    report = ingest_files(
+        [(os.path.basename(path), path) for path in args.files],
+        args.parquet or args.db,
+        max_workers=args.workers,
+        on_conflict="update" if args.overwrite else "ignore",
+        save=save,
+    )
+    print(report.to_string(index=False))
+    print(f"Total: {int(report['New Rows'].sum()):,} new rows from {len(report)} file(s) in {time.perf_counter() - start:.1f}s")
+    return 1 if report["Error"].notna().any() else 0
+
+
+def cmd_query(args):
+    # Row dumps keep the stored full-precision values
+    df = _query(args, _columns(args), compact=False)
+    if args.limit:
+        df = df.head(args.limit)
+    df.to_csv(sys.stdout, index=False)
+    return 0
+
+
+def cmd_export(args):
+    # Rows are streamed from the database into the file chunk by chunk, so memory stays flat for any result size
+    fmt = _export_format(args.output, args.format)
+    if args.trades:
+        from equity_utils import iter_trades
+
+        if args.parquet:
+            raise SystemExit("Trades are only stored in the SQLite database")
+        chunks = iter_trades(args.db, funds=_split(args.funds), date_range=_date_range(args))
+    else:
+        chunks = _query_chunks(args, _columns(args))
+    rows = write_export(chunks, args.output, fmt)
+    print(f"Exported {rows:,} rows to {args.output}")
+    return 0
+
+
+def cmd_sync(args):
+    from drive_utils import (
+        download_db_from_drive, upload_db_to_drive, pull_changes, push_changes, get_drive_service,
+        LocalDriveService, DRIVE_FOLDER_ID, DRIVE_FILE_ID,
+    )
+
+    if args.credentials:
+        os.environ["GOOGLE_DRIVE_CREDENTIALS"] = args.credentials
+    if args.local_drive:
+        # File IDs are file names in a local drive folder
+        service = LocalDriveService(args.local_drive)
+        file_id, folder_id = args.file_id or os.path.basename(args.db), args.folder_id or args.local_drive
+    else:
+        service = get_drive_service()
+        file_id, folder_id = args.file_id or DRIVE_FILE_ID, args.folder_id or DRIVE_FOLDER_ID
+
+    chunk_size = args.chunk_mb * 1024 * 1024
+    if args.direction == "pull" and args.full:
+        download_db_from_drive(file_id, args.db, service, chunk_size=chunk_size)
+        print(f"Downloaded {args.db} from Drive")
+    elif args.direction == "pull":
+        print(f"Applied {pull_changes(args.db, folder_id, file_id, service)} changeset(s) to {args.db}")
+    elif args.full:
+        file_id = upload_db_to_drive(args.db, folder_id, service, encoding=args.encoding, chunk_size=chunk_size)
+        print(f"Uploaded {args.db} to Drive. File ID: {file_id}")
+    else:
+        name = push_changes(args.db, folder_id, file_id, service)
+        print(f"Pushed {name}" if name else "No local changes to push")
+    return 0
+
+
+def cmd_parquet(args):
+    from parquet_store import convert_sqlite_to_parquet
+
+    start = time.perf_counter()
+    try:
+        rows = convert_sqlite_to_parquet(args.db, args.root, args.partition)
+    except ValueError as exc:
+        raise SystemExit(str(exc)) from exc
+    print(f"Converted {rows:,} rows from {args.db} to {args.root} in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+def cmd_analytics(args):
+    df = _query(args, [args.column])
+    pivot_df = build_pivot(df, [args.column])
+    if pivot_df.empty:
+        print("No matching records.", file=sys.stderr)
+        return 1
+
+    daily_return = daily_returns(pivot_df)
+    if args.analysis == "returns":
+        result = daily_return
+    elif args.analysis == "volatility":
+        result = volatility(daily_return).to_frame(name="Volatility")
+    elif args.analysis == "correlation":
+        result = correlation(daily_return)
+    elif args.analysis == "rolling-volatility":
+        result = rolling_volatility(daily_return, args.window or None)
+    else:
+        benchmark = (args.benchmark or pivot_df.columns[0]).upper()
+        if args.analysis == "regression":
+            result = regression_stats(daily_return, benchmark)
+        elif args.analysis == "rolling-correlation":
+            result = rolling_correlation(daily_return, benchmark, args.window or None)
+        else:
+            result = rolling_beta(daily_return, benchmark, args.window)
+
+    if args.output:
+        _write(result, args.output, _export_format(args.output), index=args.analysis != "regression")
+        print(f"Wrote {args.analysis} to {args.output}")
+    else:
+        result.to_csv(sys.stdout, index=args.analysis != "regression")
+    return 0
+
+
+def _add_filters(parser, columns=True):
+    parser.add_argument("--stocks", help="Comma-separated tickers, e.g. AC,ALI")
+    parser.add_argument("--start", help="First date (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last date (YYYY-MM-DD)")
+    if columns:
+        parser.add_argument(
+            "--columns", help=f"Comma-separated subset of {','.join(STOCK_COLUMNS + list(INDICATORS))}"
+        )
+        parser.add_argument("--resolution", choices=RESOLUTIONS, default="daily", help="Bar size (default: daily)")
+
+
+def cmd_perf(args):
+    from perf_utils import summarize_log
+
+    summary = summarize_log(args.log)
+    if summary.empty:
+        print(f"No stages logged in {args.log}")
+        return 1
+    print(summary.to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m stockdb", description="Stock OHLC database tools")
+    parser.add_argument("--db", default=DB_FILE_NAME, help=f"SQLite database path (default: {DB_FILE_NAME})")
+    parser.add_argument("--parquet", metavar="ROOT", help="Use this Parquet dataset for ingest/query/export/analytics instead of the database")
+    parser.add_argument(
+        "--perf", nargs="?", const="time", choices=("time", "memory"),
+        help="Record stage timings to the perf log; 'memory' also traces each stage's peak allocation (slower)",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("ingest", help="Parse BTH workbooks and load them into stock_data")
+    p.add_argument("files", nargs="+")
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--overwrite", action="store_true", help="Update existing (Stock, Date) rows")
+    p.set_defaults(func=cmd_ingest)
+
+    p = sub.add_parser("query", help="Print matching rows as CSV")
+    _add_filters(p)
+    p.add_argument("--limit", type=int, default=None)
+    p.set_defaults(func=cmd_query)
+
+    p = sub.add_parser("export", help="Stream matching rows to CSV, Parquet or XLSX")
+    _add_filters(p)
+    p.add_argument("--output", required=True)
+    p.add_argument("--format", choices=EXPORT_FORMATS, help="Defaults to the output file extension")
+    p.add_argument("--trades", action="store_true", help="Export the stored Equity Monitor trades instead")
+    p.add_argument("--funds", help="Comma-separated funds for --trades, e.g. SSS,EC")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("sync", help="Pull or push changesets (or the whole DB) from/to Google Drive")
+    p.add_argument("direction", choices=("pull", "push"))
+    p.add_argument("--full", action="store_true", help="Transfer the whole DB file instead of changesets")
+    p.add_argument("--local-drive", metavar="DIR", help="Sync against a local folder instead of Google Drive")
+    p.add_argument("--encoding", choices=("zstd", "gzip"), help="Snapshot compression for push --full (default: zstd if installed)")
+    p.add_argument("--chunk-mb", type=int, default=8, help="Transfer chunk size in MiB for --full (default: 8)")
+    p.add_argument("--credentials", help="Service-account JSON (else GOOGLE_DRIVE_CREDENTIALS or Streamlit secrets)")
+    p.add_argument("--file-id", help="Drive file ID to pull")
+    p.add_argument("--folder-id", help="Drive folder ID to push into")
+    p.set_defaults(func=cmd_sync)
+
+    p = sub.add_parser("parquet", help="Build the Parquet copy of stock_data")
+    p.add_argument("action", choices=("convert",))
+    p.add_argument("--root", default="ohlc_parquet", help="Dataset directory (default: ohlc_parquet)")
+    p.add_argument("--partition", choices=("year", "stock"), default="year")
+    p.set_defaults(func=cmd_parquet)
+
+    p = sub.add_parser("analytics", help="Run the read-mode analyses")
+    p.add_argument("analysis", choices=ANALYSES)
+    _add_filters(p, columns=False)
+    p.add_argument("--column", default="Close", choices=STOCK_COLUMNS)
+    p.add_argument("--benchmark", help="Benchmark stock for regression and rolling stats (default: first stock)")
+    p.add_argument("--window", type=int, default=60, help="Rolling window in trading days (0 = expanding)")
+    p.add_argument("--output", help="CSV, Parquet or XLSX file; prints CSV when omitted")
+    p.set_defaults(func=cmd_analytics)
+
+    p = sub.add_parser("perf", help="Summarize the stage timings recorded with --perf or the apps' perf panel")
+    p.add_argument("--log", default=PERF_LOG, help=f"JSON-lines perf log (default: {PERF_LOG})")
+    p.set_defaults(func=cmd_perf)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.perf:
+        enable(memory=args.perf == "memory")
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
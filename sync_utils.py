@@ -0,0 +1,117 @@
+# sync_utils.py
+#
+# Local side of the Drive delta sync. Triggers on stock_data (db_utils.CHANGE_LOG_SCHEMA)
+# record every changed (Stock, Date) key in change_log until it is pushed. A push
+# exports those keys as a gzipped CSV changeset; a pull replays other clients'
+# changesets in sequence order. sync_state["changeset"] is the last changeset
+# sequence this DB already contains, so a base snapshot carries its own watermark.
+
+import io
+import sqlite3
+
+import pandas as pd
+
+from db_utils import (
+    STOCK_COLUMNS, get_pool, ensure_schema, to_sql_rows, bump_data_version, stage_changed_keys, refresh_derived,
+)
+
+CHANGESET_COLUMNS = ["Op", "Stock", "Date"] + STOCK_COLUMNS
+
+
+def _get_state(conn, key, default=None):
+    try:
+        row = conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+    except sqlite3.OperationalError:  # DB predates sync
+        return default
+    return row[0] if row else default
+
+
+def _set_state(conn, key, value):
+    conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, str(value)))
+
+
+def get_applied_changeset(db_path):
+    with get_pool(db_path).reader() as conn:
+        return int(_get_state(conn, "changeset", 0))
+
+
+def export_changeset(db_path):
+    # Returns (gzipped CSV bytes, last change_log seq) for every pending key, or (None, None) if nothing changed
+    with get_pool(db_path).writer() as conn:
+        with conn:
+            conn.execute("BEGIN")
+            ensure_schema(conn)
+        columns = ", ".join(f"d.{col}" for col in STOCK_COLUMNS)
+        changes = pd.read_sql(
+            f"""
+            SELECT c.seq, CASE WHEN d.Stock IS NULL THEN 'D' ELSE c.Op END AS Op, c.Stock, c.Date, {columns}
+            FROM change_log c
+            JOIN (SELECT MAX(seq) AS seq FROM change_log GROUP BY Stock, Date) latest ON latest.seq = c.seq
+            LEFT JOIN stock_data d ON d.Stock = c.Stock AND d.Date = c.Date
+            ORDER BY c.seq
+            """,
+            conn,
+        )
+    if changes.empty:
+        return None, None
+
+    buffer = io.BytesIO()
+    changes[CHANGESET_COLUMNS].to_csv(buffer, index=False, compression={"method": "gzip", "mtime": 0})
+    return buffer.getvalue(), int(changes["seq"].max())
+
+
+def mark_pushed(db_path, last_seq, changeset=None):
+    # The pushed keys are now on Drive, as `changeset` or inside a base snapshot; drop them from the pending log
+    with get_pool(db_path).writer() as conn, conn:
+        conn.execute("DELETE FROM change_log WHERE seq <= ?", (last_seq,))
+        if changeset is not None:
+            _set_state(conn, "changeset", changeset)
+
+
+def clear_change_log(conn):
+    # Empties the pending log on `conn` (e.g. a snapshot copy); returns the last seq it held
+    try:
+        last_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+    except sqlite3.OperationalError:  # DB predates sync
+        return 0
+    conn.execute("DELETE FROM change_log")
+    return last_seq
+
+
+def apply_changeset(db_path, data, changeset=None):
+    # Replays a changeset. With `changeset` set it is a remote one: the replay is not re-logged for
+    # pushing and the watermark advances. Without it the rows are local edits and stay pending.
+    changes = pd.read_csv(io.BytesIO(data), compression="gzip", dtype={"Stock": str, "Date": str})
+    upserts = changes[changes["Op"] == "U"]
+    deletes = changes[changes["Op"] == "D"]
+
+    columns = ["Stock", "Date"] + STOCK_COLUMNS
+    placeholders = ", ".join("?" * len(columns))
+    updates = ", ".join(f"{col} = excluded.{col}" for col in STOCK_COLUMNS)
+
+    with get_pool(db_path).writer() as conn, conn:
+        conn.execute("BEGIN")
+        ensure_schema(conn)
+        before = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+        conn.executemany(
+            f"INSERT INTO stock_data VALUES ({placeholders}) ON CONFLICT (Stock, Date) DO UPDATE SET {updates}",
+            to_sql_rows(upserts, columns),
+        )
+        conn.executemany(
+            "DELETE FROM stock_data WHERE Stock = ? AND Date = ?",
+            deletes[["Stock", "Date"]].itertuples(index=False, name=None),
+        )
+        # The triggers just logged every key the replay wrote, which is exactly what the rollups and indicators need
+        stage_changed_keys(conn, "SELECT Stock, Date FROM change_log WHERE seq > ?", (before,))
+        refresh_derived(conn)
+        if changeset is not None:
+            conn.execute("DELETE FROM change_log WHERE seq > ?", (before,))
+            _set_state(conn, "changeset", changeset)
+    bump_data_version()
+    return len(changes)
+
+
+def checkpoint(db_path):
+    # Fold the WAL into the main file so a whole-file upload sees every committed write
+    with get_pool(db_path).writer() as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
@@ -0,0 +1,44 @@
+# tests/conftest.py
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_utils import close_pool  # noqa: E402
+
+
+def make_rows(stocks=("AC", "ALI", "BDO"), start="2024-01-01", days=120, seed=0):
+    # Business-day OHLC rows in the shape parse_excel hands to save_to_db
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, periods=days)
+    frames = []
+    for stock in stocks:
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, days)))
+        volume = rng.integers(1_000, 100_000, days)
+        frames.append(pd.DataFrame({
+            "Stock": stock,
+            "Date": dates.date,
+            "Open": close * (1 + rng.normal(0, 0.003, days)),
+            "High": close * 1.01,
+            "Low": close * 0.99,
+            "Close": close,
+            "Volume": volume,
+            "Value": close * volume,
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+@pytest.fixture
+def rows():
+    return make_rows()
+
+
+@pytest.fixture(autouse=True)
+def _close_pools():
+    yield
+    close_pool()
@@ -0,0 +1,67 @@
+# tests/test_analytics.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import IncrementalRolling, regression_stats, rolling_beta, rolling_correlation, rolling_volatility
+from benchmarks.bench_regression import make_returns, regression_stats_loop
+
+
+def _returns(days=30, stocks=("AC", "ALI", "BDO"), seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.DatetimeIndex(pd.bdate_range("2024-01-01", periods=days), name="Date")
+    return pd.DataFrame(rng.normal(0, 0.01, (days, len(stocks))), index=index, columns=pd.Index(stocks, name="Stock"))
+
+
+def _expected(stat, daily_return, window):
+    if stat == "volatility":
+        return rolling_volatility(daily_return, window)
+    return rolling_correlation(daily_return, "AC", window)
+
+
+@pytest.mark.parametrize("window", [None, 20])
+@pytest.mark.parametrize("stat", ["volatility", "correlation"])
+@pytest.mark.parametrize("days", [0, 1])
+def test_rolling_stat_on_empty_and_one_row_returns(stat, window, days):
+    daily_return = _returns()
+    roller = IncrementalRolling(stat, window, "AC" if stat == "correlation" else None)
+    result = roller.update(daily_return.iloc[:days])
+    expected = _expected(stat, daily_return.iloc[:days], window)
+    assert list(result.columns) == list(expected.columns)
+    assert len(result) == days
+    assert result.isna().all().all()
+
+    # The same roller keeps extending once the range has rows
+    pd.testing.assert_frame_equal(roller.update(daily_return), _expected(stat, daily_return, window), check_freq=False)
+
+
+@pytest.mark.parametrize("na_rate", [0.0, 0.05])
+def test_regression_stats_match_per_stock_least_squares(na_rate):
+    # Each stock is fitted on the rows where it and the benchmark are both present
+    daily_return = make_returns(20, 1, na_rate=na_rate)
+    benchmark = daily_return.columns[0]
+    pd.testing.assert_frame_equal(
+        regression_stats(daily_return, benchmark), regression_stats_loop(daily_return, benchmark),
+        check_exact=False, rtol=1e-9, atol=1e-12,
+    )
+
+
+def test_regression_stats_with_too_few_common_rows():
+    daily_return = _returns(days=5)
+    daily_return.iloc[1:, 1] = np.nan  # ALI shares a single row with AC
+    stats = regression_stats(daily_return, "AC").set_index("Stock")
+    assert stats.loc["ALI", ["Alpha", "Beta", "R²"]].isna().all()
+    assert stats.loc["BDO", ["Alpha", "Beta", "R²"]].notna().all()
+
+
+@pytest.mark.parametrize("na_rate", [0.0, 0.05])
+def test_rolling_beta_matches_pandas_rolling_cov_over_var(na_rate):
+    window = 20
+    daily_return = make_returns(10, 1, na_rate=na_rate)
+    benchmark = daily_return.columns[0]
+    x = daily_return[benchmark]
+    others = daily_return.drop(columns=benchmark)
+    # A window with a missing value on either side has no beta, as with pandas' min_periods=window
+    expected = others.rolling(window).cov(x).div(x.rolling(window).var(), axis=0)
+    pd.testing.assert_frame_equal(rolling_beta(daily_return, benchmark, window), expected, rtol=1e-8, check_freq=False)
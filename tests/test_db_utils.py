@@ -0,0 +1,79 @@
+# tests/test_db_utils.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from db_utils import STOCK_COLUMNS, read_database, save_to_db
+
+
+def _stored(db_path):
+    return read_database(db_path, compact=False).set_index(["Stock", "Date"]).sort_index()
+
+
+def _keys(df):
+    return pd.MultiIndex.from_arrays([df["Stock"], pd.to_datetime(df["Date"])], names=["Stock", "Date"])
+
+
+@pytest.fixture
+def overlapping(rows):
+    # `first` is stored; `second` repeats its last 20 days with new prices and adds 10 more
+    days = sorted(rows["Date"].unique())
+    first = rows[rows["Date"] <= days[99]]
+    second = rows[rows["Date"] > days[79]].copy()
+    second[["Open", "High", "Low", "Close"]] *= 2
+    second["Value"] *= 3
+    return first, second, rows[rows["Date"] > days[99]]
+
+
+@pytest.mark.parametrize("on_conflict", ["ignore", "update"])
+def test_overlapping_saves(tmp_path, overlapping, on_conflict):
+    db_path = str(tmp_path / "ohlc.db")
+    first, second, unseen = overlapping
+    assert len(save_to_db(first, db_path)) == len(first)
+
+    new_rows = save_to_db(second, db_path, on_conflict=on_conflict)
+    # Both modes report only the keys that were not stored yet, with python dates like parse_excel's
+    assert len(new_rows) == len(unseen)
+    assert _keys(new_rows).sort_values().equals(_keys(unseen).sort_values())
+    assert all(type(d).__name__ == "date" for d in new_rows["Date"])
+
+    stored = _stored(db_path)
+    assert len(stored) == len(first) + len(unseen)
+    winner = first if on_conflict == "ignore" else second
+    overlap = _keys(first).intersection(_keys(second))
+    expected = winner.set_index(_keys(winner)).loc[overlap]
+    np.testing.assert_allclose(stored.loc[overlap, "Close"], expected["Close"])
+    np.testing.assert_allclose(stored.loc[overlap, "VWAP"], (expected["Value"] / expected["Volume"]).round(4))
+    # The new keys always come from the second batch
+    np.testing.assert_allclose(stored.loc[_keys(unseen), "Close"], second.set_index(_keys(second)).loc[_keys(unseen), "Close"])
+
+
+@pytest.mark.parametrize("on_conflict", ["ignore", "update"])
+def test_saving_the_same_rows_again(tmp_path, rows, on_conflict):
+    db_path = str(tmp_path / "ohlc.db")
+    save_to_db(rows, db_path)
+    assert save_to_db(rows, db_path, on_conflict=on_conflict).empty
+    assert len(_stored(db_path)) == len(rows)
+
+
+def test_batch_cleaning_and_duplicates(tmp_path, rows):
+    db_path = str(tmp_path / "ohlc.db")
+    batch = rows.head(3)
+    dirty = pd.concat([
+        batch,
+        batch.head(1).assign(Close=-1.0),  # a repeated key: the first occurrence wins
+        batch.head(1).assign(Date=None),
+        batch.head(1).assign(Date="1970-01-01"),
+        batch.head(1).assign(Stock=None),
+    ], ignore_index=True)
+    assert len(save_to_db(dirty, db_path)) == 3
+    stored = _stored(db_path)
+    assert len(stored) == 3
+    assert (stored["Close"] > 0).all()
+    assert list(stored.columns) == STOCK_COLUMNS
+
+
+def test_unknown_conflict_mode(tmp_path, rows):
+    with pytest.raises(ValueError):
+        save_to_db(rows, str(tmp_path / "ohlc.db"), on_conflict="replace")
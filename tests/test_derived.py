@@ -0,0 +1,101 @@
+# tests/test_derived.py
+#
+# The weekly/monthly rollups and stock_indicators are maintained incrementally; after
+# any mix of writes they must match a from-scratch build over the final stock_data.
+
+import os
+import shutil
+import sqlite3
+import tempfile
+from contextlib import closing
+
+import pandas as pd
+import pytest
+
+from db_utils import (
+    INDICATOR_TABLE, ROLLUPS, STOCK_COLUMNS, STOCK_DATA_SCHEMA, delete_records, ensure_schema, get_pool,
+    prepare_stock_data, save_to_db, to_sql_rows,
+)
+from sync_utils import apply_changeset, checkpoint, clear_change_log, export_changeset
+
+DERIVED_TABLES = [table for table, _, _ in ROLLUPS.values()] + [INDICATOR_TABLE]
+
+
+def _legacy_db(db_path, df):
+    # stock_data alone, as written before the derived tables existed
+    columns = ["Stock", "Date"] + STOCK_COLUMNS
+    with closing(sqlite3.connect(db_path)) as conn, conn:
+        conn.execute(STOCK_DATA_SCHEMA.format(table="stock_data"))
+        conn.executemany(
+            f"INSERT INTO stock_data VALUES ({', '.join('?' * len(columns))})",
+            to_sql_rows(prepare_stock_data(df), columns),
+        )
+
+
+def _rebuilt(db_path, tmp_path):
+    # The same stock_data in a fresh legacy DB, so ensure_schema computes every derived row from scratch
+    with get_pool(db_path).reader() as conn:
+        stock_data = pd.read_sql("SELECT * FROM stock_data", conn)
+    fresh = os.path.join(tempfile.mkdtemp(dir=tmp_path), "fresh.db")
+    _legacy_db(fresh, stock_data)
+    with closing(sqlite3.connect(fresh)) as conn, conn:
+        conn.execute("BEGIN")
+        ensure_schema(conn)
+    return fresh
+
+
+def _table(db_path, table):
+    with closing(sqlite3.connect(db_path)) as conn:
+        return pd.read_sql(f"SELECT * FROM {table} ORDER BY Stock, Date", conn)
+
+
+def _assert_derived_match(db_path, tmp_path):
+    fresh = _rebuilt(db_path, tmp_path)
+    for table in DERIVED_TABLES:
+        pd.testing.assert_frame_equal(_table(db_path, table), _table(fresh, table), check_dtype=False, obj=table)
+
+
+@pytest.fixture
+def db(tmp_path, rows):
+    # Backfill: a pre-rollup DB whose derived tables are built on its first write, which then appends a day
+    db_path = str(tmp_path / "ohlc.db")
+    days = sorted(rows["Date"].unique())
+    _legacy_db(db_path, rows[(rows["Date"] > days[9]) & (rows["Date"] < days[-1])])
+    save_to_db(rows[rows["Date"] == days[-1]], db_path)
+    return db_path
+
+
+def test_backfill_matches_a_full_build(db, tmp_path):
+    _assert_derived_match(db, tmp_path)
+
+
+def test_writes_keep_derived_tables_in_line_with_a_full_build(db, tmp_path, rows):
+    days = sorted(rows["Date"].unique())
+
+    # Older history inserted before every stored row, then mid-history corrections
+    save_to_db(rows[rows["Date"] <= days[9]], db)
+    middle = rows[rows["Date"].isin(days[40:45])]
+    save_to_db(middle.assign(Close=middle["Close"] * 1.1, High=middle["High"] * 1.2), db, on_conflict="update")
+    _assert_derived_match(db, tmp_path)
+
+    # A whole day, and one stock's first row, removed
+    delete_records(db, days[60])
+    delete_records(db, days[0], "ALI")
+    _assert_derived_match(db, tmp_path)
+
+    # Another client's changeset: it edits, deletes and re-adds rows across several weeks and months
+    checkpoint(db)
+    other = str(tmp_path / "other.db")
+    shutil.copy(db, other)
+    with get_pool(other).writer() as conn, conn:
+        clear_change_log(conn)
+    late = rows[rows["Date"].isin(days[80:90])]
+    save_to_db(late.assign(Open=late["Open"] * 0.9, Low=late["Low"] * 0.8), other, on_conflict="update")
+    save_to_db(rows[rows["Date"] == days[60]], other)
+    delete_records(other, days[100], "BDO")
+    delete_records(other, days[20])
+    data, _ = export_changeset(other)
+
+    apply_changeset(db, data, changeset=1)
+    _assert_derived_match(db, tmp_path)
+    _assert_derived_match(other, tmp_path)
@@ -0,0 +1,30 @@
+# tests/test_ingest.py
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import write_bth_workbook
+from db_utils import read_database, save_to_db
+from excel_utils import parse_excel
+from ingest import ingest_files
+
+
+@pytest.fixture
+def workbooks(tmp_path):
+    # Same tickers and dates with different prices; the first, larger workbook takes longer to parse
+    return [
+        ("big.xlsx", write_bth_workbook(str(tmp_path / "big.xlsx"), n_tickers=40, years=2, seed=1)),
+        ("small.xlsx", write_bth_workbook(str(tmp_path / "small.xlsx"), n_tickers=2, years=1, seed=2)),
+    ]
+
+
+@pytest.mark.parametrize("on_conflict", ["ignore", "update"])
+def test_overlapping_workbooks_save_in_input_order(tmp_path, workbooks, on_conflict):
+    db_path, expected_path = str(tmp_path / "ohlc.db"), str(tmp_path / "expected.db")
+    report = ingest_files(workbooks, db_path, max_workers=2, on_conflict=on_conflict)
+    assert report["File"].tolist() == ["big.xlsx", "small.xlsx"]
+    assert report["Error"].isna().all()
+
+    new_rows = [len(save_to_db(parse_excel(path), expected_path, on_conflict=on_conflict)) for _, path in workbooks]
+    assert report["New Rows"].tolist() == new_rows
+    pd.testing.assert_frame_equal(read_database(db_path, compact=False), read_database(expected_path, compact=False))
@@ -0,0 +1,50 @@
+# tests/test_parquet_store.py
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import write_bth_workbook
+from db_utils import read_database
+from ingest import ingest_files
+from parquet_store import read_parquet, save_to_parquet
+from stockdb import main
+
+
+def _stored(root):
+    return read_parquet(root, compact=False).sort_values(["Stock", "Date"]).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("partition", ["year", "stock"])
+def test_save_to_parquet_round_trip(tmp_path, rows, partition):
+    root = str(tmp_path / "ds")
+    first = rows[rows["Date"] < pd.Timestamp("2024-04-01").date()]
+
+    # A new dataset root: every row is new
+    assert len(save_to_parquet(first, root, partition=partition)) == len(first)
+    assert len(_stored(root)) == len(first)
+
+    # Duplicate keys are kept on "ignore" and replaced on "update"; only unseen keys are reported
+    changed = rows.head(5).assign(Close=1.0)
+    assert save_to_parquet(changed, root, partition=partition).empty
+    assert (_stored(root)["Close"] != 1.0).all()
+    assert save_to_parquet(changed, root, on_conflict="update", partition=partition).empty
+    assert (_stored(root).set_index(["Stock", "Date"]).loc[changed.set_index(["Stock", "Date"]).index, "Close"] == 1.0).all()
+
+    # The rest of the year, then the first rows of a new year partition
+    assert len(save_to_parquet(rows, root, partition=partition)) == len(rows) - len(first)
+    next_year = rows.groupby("Stock").head(1).assign(Date=pd.Timestamp("2025-01-02").date())
+    assert len(save_to_parquet(next_year, root, partition=partition)) == 3
+    stored = _stored(root)
+    assert len(stored) == len(rows) + 3
+    assert not stored.duplicated(["Stock", "Date"]).any()
+
+
+def test_cli_ingest_into_parquet_matches_sqlite(tmp_path):
+    workbook = write_bth_workbook(str(tmp_path / "bth.xlsx"), n_tickers=3, years=1)
+    root, db_path = str(tmp_path / "ds"), str(tmp_path / "ohlc.db")
+    assert main(["--parquet", root, "ingest", workbook, "--workers", "1"]) == 0
+    ingest_files([("bth.xlsx", workbook)], db_path, max_workers=1)
+
+    from_db = read_database(db_path, compact=False)[_stored(root).columns]
+    pd.testing.assert_frame_equal(_stored(root), from_db.sort_values(["Stock", "Date"]).reset_index(drop=True),
+                                  check_dtype=False)
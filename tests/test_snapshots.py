@@ -0,0 +1,94 @@
+# tests/test_snapshots.py
+#
+# Whole-DB snapshots through upload_db_to_drive / download_db_from_drive, against the LocalDriveService fake.
+
+import json
+import os
+import shutil
+import sqlite3
+from contextlib import closing
+
+import pandas as pd
+import pytest
+
+from conftest import make_rows
+from db_utils import close_pool, read_database, save_to_db
+from drive_utils import LocalDriveService, download_db_from_drive, upload_db_to_drive
+
+BASE = "a.db"  # LocalDriveService file IDs are file names
+CHUNK = 256 * 1024  # the smallest Drive chunk, so a download takes several
+
+
+@pytest.fixture
+def drive(tmp_path):
+    return LocalDriveService(str(tmp_path / "drive"))
+
+
+@pytest.fixture
+def base(tmp_path):
+    path = str(tmp_path / BASE)
+    save_to_db(make_rows(stocks=[f"S{i:02d}" for i in range(40)], days=250), path)
+    return path
+
+
+def _stock_data(db_path):
+    return read_database(db_path, compact=False).sort_values(["Stock", "Date"]).reset_index(drop=True)
+
+
+def _old_db(path):
+    # A different DB at the download's destination
+    save_to_db(make_rows(stocks=("OLD",), days=5, seed=1), path)
+    close_pool(path)
+
+
+@pytest.mark.parametrize("encoding", ["zstd", "gzip"])
+def test_snapshot_round_trip(tmp_path, drive, base, encoding):
+    if encoding == "zstd":
+        pytest.importorskip("zstandard")
+    upload_db_to_drive(base, drive.root, drive, encoding=encoding, chunk_size=CHUNK)
+    assert drive.files().get(fileId=BASE).execute()["appProperties"]["encoding"] == encoding
+    assert os.path.getsize(drive._path(BASE)) > CHUNK
+
+    target = str(tmp_path / "b.db")
+    download_db_from_drive(BASE, target, drive, chunk_size=CHUNK)
+    pd.testing.assert_frame_equal(_stock_data(target), _stock_data(base))
+
+
+def test_checksum_mismatch_keeps_the_existing_db(tmp_path, drive, base):
+    upload_db_to_drive(base, drive.root, drive, encoding="gzip", chunk_size=CHUNK)
+    properties_path = drive._properties_path(BASE)
+    with open(properties_path) as f:
+        properties = json.load(f)
+    with open(properties_path, "w") as f:
+        json.dump(dict(properties, sha256="0" * 64), f)
+
+    target = str(tmp_path / "b.db")
+    _old_db(target)
+    before = _stock_data(target)
+    with pytest.raises(IOError, match="Checksum mismatch"):
+        download_db_from_drive(BASE, target, drive, chunk_size=CHUNK)
+    assert not os.path.exists(target + ".download")
+    pd.testing.assert_frame_equal(_stock_data(target), before)
+
+
+def test_stale_wal_is_not_replayed_onto_the_new_db(tmp_path, drive, base):
+    upload_db_to_drive(base, drive.root, drive, encoding="gzip", chunk_size=CHUNK)
+
+    # Leave behind a valid -wal/-shm pair belonging to the old file, as a crashed writer would
+    target = str(tmp_path / "b.db")
+    _old_db(target)
+    with closing(sqlite3.connect(target)) as conn:
+        conn.execute("PRAGMA wal_autocheckpoint = 0")
+        with conn:
+            conn.execute("DELETE FROM stock_data")
+        for suffix in ("-wal", "-shm"):
+            shutil.copy(target + suffix, str(tmp_path / f"stale{suffix}"))
+    for suffix in ("-wal", "-shm"):
+        shutil.copy(str(tmp_path / f"stale{suffix}"), target + suffix)
+
+    download_db_from_drive(BASE, target, drive, chunk_size=CHUNK)
+    assert not os.path.exists(target + "-wal")
+    assert not os.path.exists(target + "-shm")
+    pd.testing.assert_frame_equal(_stock_data(target), _stock_data(base))
+    with closing(sqlite3.connect(target)) as conn:
+        assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
@@ -0,0 +1,157 @@
+# tests/test_sync.py
+#
+# Drive delta sync between two local clients, against the LocalDriveService fake.
+
+import gzip
+import os
+
+import pandas as pd
+import pytest
+
+from db_utils import delete_records, get_pool, read_database, save_to_db
+from drive_utils import (
+    LocalDriveService, _changeset_files, list_changesets, pull_changes, push_changes, upload_db_to_drive,
+)
+from equity_utils import TRADE_COLUMNS, read_trades, save_trades
+
+BASE = "a.db"  # LocalDriveService file IDs are file names
+
+
+class RacingDrive(LocalDriveService):
+    # Runs `before_create` once, right before the next upload, as if another client pushed in between
+    before_create = None
+
+    def create(self, body, **kwargs):
+        hook, self.before_create = self.before_create, None
+        if hook is not None:
+            hook()
+        return super().create(body, **kwargs)
+
+
+@pytest.fixture
+def drive(tmp_path):
+    return RacingDrive(str(tmp_path / "drive"))
+
+
+@pytest.fixture
+def clients(tmp_path, drive, rows):
+    # Client A creates the base from all but the last day; client B bootstraps from it
+    a, b = str(tmp_path / BASE), str(tmp_path / "b.db")
+    save_to_db(rows[rows["Date"] < rows["Date"].max()], a)
+    upload_db_to_drive(a, drive.root, drive)
+    pull_changes(b, drive.root, BASE, drive)
+    return a, b
+
+
+def _stock_data(db_path):
+    return read_database(db_path, compact=False).sort_values(["Stock", "Date"]).reset_index(drop=True)
+
+
+def _pending(db_path):
+    with get_pool(db_path).reader() as conn:
+        return conn.execute("SELECT COUNT(*) FROM change_log").fetchone()[0]
+
+
+def _changeset_rows(drive, name):
+    with gzip.open(os.path.join(drive.root, name)) as fh:
+        return pd.read_csv(fh)
+
+
+def _push(db_path, drive):
+    return push_changes(db_path, drive.root, BASE, drive)
+
+
+def _pull(db_path, drive):
+    return pull_changes(db_path, drive.root, BASE, drive)
+
+
+def test_new_base_carries_no_pending_changes(clients, drive):
+    a, b = clients
+    assert _pending(a) == 0
+    assert _pending(b) == 0
+    assert _push(b, drive) is None
+    pd.testing.assert_frame_equal(_stock_data(b), _stock_data(a))
+
+
+def test_push_and_pull_replay_upserts_and_deletes(clients, drive, rows):
+    a, b = clients
+    last_day = rows[rows["Date"] == rows["Date"].max()]
+    save_to_db(last_day, a)
+    save_to_db(last_day.assign(Close=1.0).head(1), a, on_conflict="update")
+    delete_records(a, rows["Date"].iloc[0], "ALI")
+
+    name = _push(a, drive)
+    assert len(_changeset_rows(drive, name)) == len(last_day) + 1
+    assert _pending(a) == 0
+    assert _pull(b, drive) == 1
+    pd.testing.assert_frame_equal(_stock_data(b), _stock_data(a))
+    assert _pending(b) == 0
+
+
+def test_full_upload_prunes_all_but_the_newest_changeset(clients, drive, rows):
+    a, _ = clients
+    days = sorted(rows["Date"].unique())
+    for day in days[-3:-1]:
+        delete_records(a, day)
+        _push(a, drive)
+    assert [seq for seq, _ in list_changesets(drive.root, drive)] == [1, 2]
+
+    upload_db_to_drive(a, drive.root, drive)
+    assert [seq for seq, _ in list_changesets(drive.root, drive)] == [2]
+
+
+def test_pull_rebases_onto_a_newer_base_and_keeps_local_edits(clients, drive, rows):
+    a, b = clients
+    days = sorted(rows["Date"].unique())
+    for day in days[-3:-1]:
+        delete_records(a, day)
+        _push(a, drive)
+    upload_db_to_drive(a, drive.root, drive)
+
+    # B never saw changeset 1, which the upload pruned, so its pull must download the base again
+    local = rows[rows["Stock"] == "AC"].assign(Stock="ZZZ").head(5)
+    save_to_db(local, b)
+    _pull(b, drive)
+    assert set(_stock_data(b)["Stock"]) == {"AC", "ALI", "BDO", "ZZZ"}
+    assert not _stock_data(b)["Date"].isin(pd.to_datetime(days[-3:-1])).any()
+
+    # Only B's own edits are still pending, and they reach A as one changeset
+    name = _push(b, drive)
+    assert sorted(_changeset_rows(drive, name)["Stock"].unique()) == ["ZZZ"]
+    _pull(a, drive)
+    pd.testing.assert_frame_equal(_stock_data(a), _stock_data(b))
+
+
+def test_rebase_keeps_stored_trades(clients, drive, rows):
+    a, b = clients
+    trades = pd.DataFrame(
+        [[pd.Timestamp("2024-03-01"), "FUND1", "Equity", "AC", "Buy", "BRK", 100.0, 10.0, 1000.0]],
+        columns=TRADE_COLUMNS,
+    )
+    save_trades(trades, b)
+    days = sorted(rows["Date"].unique())
+    for day in days[-3:-1]:
+        delete_records(a, day)
+        _push(a, drive)
+    upload_db_to_drive(a, drive.root, drive)
+
+    _pull(b, drive)
+    assert not _stock_data(b)["Date"].isin(pd.to_datetime(days[-3:-1])).any()
+    pd.testing.assert_frame_equal(read_trades(b)[TRADE_COLUMNS], trades, check_dtype=False)
+
+
+def test_concurrent_pushes_of_one_sequence_number(clients, drive, rows):
+    a, b = clients
+    days = sorted(rows["Date"].unique())
+    delete_records(a, days[-2], "AC")
+    save_to_db(rows[rows["Date"] == days[-1]], b)
+
+    # A uploads changeset 1 after B pulled but before B's own upload of changeset 1 lands
+    drive.before_create = lambda: push_changes(a, drive.root, BASE, LocalDriveService(drive.root))
+    name = _push(b, drive)
+
+    assert name == "ohlc_changeset_000002.csv.gz"
+    assert [seq for seq, _, _ in _changeset_files(drive.root, drive)] == [1, 2]
+    _pull(a, drive)
+    pd.testing.assert_frame_equal(_stock_data(a), _stock_data(b))
+    assert len(_stock_data(a)) == len(rows) - 1
@@ -0,0 +1,81 @@
+# ui_utils.py
+#
+# Table and chart helpers for the apps. Large frames are never sent to the
+# browser whole: tables show one page at a time (only that slice is formatted
+# and serialized) and line charts are LTTB-downsampled to a fixed point budget.
+# export_button offers the rows behind a table as a streamed CSV/Parquet/XLSX
+# download. perf_panel shows the stage timings recorded by perf_utils when the
+# server was started with STOCKDB_PERF set.
+
+import math
+
+import streamlit as st
+
+from analytics import downsample_frame, CHART_MAX_POINTS
+from export_utils import EXPORT_FORMATS, MIME_TYPES, export_bytes
+from perf_utils import trace, is_enabled, log_path, recent_stages, summarize_stages, RECENT_MAX
+
+TABLE_PAGE_SIZE = 250
+# Wide frames are indexed by a DatetimeIndex; show it as a plain date
+DATE_INDEX = {"_index": st.column_config.DateColumn("Date", format="YYYY-MM-DD")}
+
+
+def paged_dataframe(df, key, page_size=TABLE_PAGE_SIZE, **kwargs):
+    # kwargs go to st.dataframe, e.g. column_config to format numbers in the browser rather than as strings
+    n_pages = max(math.ceil(len(df) / page_size), 1)
+    if n_pages == 1:
+        with trace("st.dataframe", rows=len(df)):
+            st.dataframe(df, **kwargs)
+        return
+
+    page_key = f"{key}_page"
+    # A narrower selection can leave the remembered page past the end
+    if st.session_state.get(page_key, 1) > n_pages:
+        st.session_state[page_key] = n_pages
+    controls, info = st.columns([1, 4])
+    page = controls.number_input("Page", min_value=1, max_value=n_pages, step=1, key=page_key)
+    start = (page - 1) * page_size
+    stop = min(start + page_size, len(df))
+    info.caption(f"Rows {start + 1:,}–{stop:,} of {len(df):,} (page {page} of {n_pages})")
+    page_df = df.iloc[start:stop]
+    with trace("st.dataframe", rows=len(page_df)):
+        st.dataframe(page_df, **kwargs)
+
+
+def line_chart(df, max_points=CHART_MAX_POINTS, **kwargs):
+    with trace("line_chart", rows=len(df)):
+        st.line_chart(downsample_frame(df, max_points), **kwargs)
+
+
+def export_button(make_chunks, file_stem, key, label="⬇️ Export"):
+    # `make_chunks` (no arguments -> iterable of frames, e.g. a functools.partial of db_utils.iter_database) only
+    # runs when the button is clicked, on Streamlit's download thread, so reruns never build the file
+    fmt_col, button_col = st.columns([1, 4])
+    fmt = fmt_col.selectbox(
+        "Export format", EXPORT_FORMATS, key=f"{key}_format", format_func=str.upper, label_visibility="collapsed"
+    )
+    button_col.download_button(
+        label,
+        lambda: export_bytes(make_chunks(), fmt),
+        file_name=f"{file_stem}.{fmt}",
+        mime=MIME_TYPES[fmt],
+        key=f"{key}_export",
+        on_click="ignore",
+    )
+
+
+def perf_panel():
+    # Tracing is process-wide, so it is switched on for the whole server (STOCKDB_PERF=1 or =memory when starting
+    # streamlit), never from one session's widgets; the panel only shows what is being recorded
+    if not is_enabled():
+        return
+    with st.sidebar.expander("⏱️ Perf"):
+        summary = summarize_stages(recent_stages())
+        if summary.empty:
+            st.caption("No stages recorded yet. Timings appear from the next rerun.")
+            return
+        # Rendered before the page body runs, so this covers everything up to the previous rerun
+        st.dataframe(summary, hide_index=True, column_config={
+            col: st.column_config.NumberColumn(format="%.3f") for col in ("Total_s", "Mean_s", "P95_s", "Max_s")
+        })
+        st.caption(f"Last {RECENT_MAX} stages in this process; every stage is also appended to {log_path()}.")